@@ -0,0 +1,188 @@
+"""
+ASGI entry point for high-concurrency deployments.
+
+Serves the same routes as server.py from an asyncio event loop:
+
+    pip install uvicorn a2wsgi
+    uvicorn asgi:app --port 5000
+    # or: python asgi.py
+
+Static content (/api/clans, /api/zone/<id>) is answered on the event loop
+from the game data cache, and /api/stream/<id> event streams are served on
+the loop too, so an open stream costs a coroutine rather than a thread.
+Every other request runs the (synchronous) Flask app through a2wsgi's
+WSGI adapter on a bounded thread pool (ASGI_THREADS, sized to the database
+pool): database access stays blocking, but a slow read ties up a pool
+thread instead of a whole worker process and idle players cost nothing.
+Requests for one character are serialized by the combat store's lock
+(server.character_route), the same under this entry point as any other.
+"""
+
+import asyncio
+import os
+import sys
+
+from a2wsgi import WSGIMiddleware
+
+import server
+from game_data import cached_game_data, get_game_data
+from streams import HEARTBEAT, HEARTBEAT_SECONDS, OPEN, parse_last_event_id
+
+STREAM_PREFIX = '/api/stream/'
+
+class AsyncSubscriber:
+    """EventBroker subscriber that hands messages to an event loop queue"""
+
+    def __init__(self, loop, max_queue):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def deliver(self, message):
+        # Called from whichever thread published
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too slow to keep up: end the stream, the client reconnects with Last-Event-ID
+            self.overflowed = True
+
+class AsgiApp:
+    """ASGI wrapper around the Flask app with native static routes"""
+
+    def __init__(self, flask_app, max_threads=32):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=max_threads)
+        # Blocking work started from the loop shares the adapter's pool
+        self.executor = self.wsgi.executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await loop.run_in_executor(self.executor, server.startup)
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': repr(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await loop.run_in_executor(self.executor, server.shutdown)
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # ============================================
+    # HTTP
+    # ============================================
+
+    async def http(self, scope, receive, send):
+        if scope['method'] in ('GET', 'HEAD') and await self.static_route(scope, send):
+            return
+
+        path = scope['path']
+        if scope['method'] == 'GET' and path.startswith(STREAM_PREFIX) and path[len(STREAM_PREFIX):].isdigit():
+            await self.stream(scope, receive, send, int(path[len(STREAM_PREFIX):]))
+            return
+
+        await self.wsgi(scope, receive, send)
+
+    async def static_route(self, scope, send):
+        """Serve cached game data without leaving the event loop"""
+        path = scope['path']
+        zone_id = None
+        if path.startswith('/api/zone/') and path[len('/api/zone/'):].isdigit():
+            zone_id = int(path[len('/api/zone/'):])
+        elif path != '/api/clans':
+            return False
+
+        game_data = self.game_data()
+        if game_data is None:
+            # Loading runs the database queries, so keep it off the loop
+            game_data = await asyncio.get_running_loop().run_in_executor(self.executor, self.load_game_data)
+        if zone_id is None:
+            payload = game_data.clans_payload
+        else:
+            payload = game_data.zone_payloads.get(zone_id)
+            if payload is None:
+                return False  # Flask renders the 404
+
+        etag = f'"{payload.etag}"'
+        headers = [(b'etag', etag.encode())]
+        if_none_match = dict(scope['headers']).get(b'if-none-match', b'').decode()
+        if etag in (tag.strip() for tag in if_none_match.split(',')):
+            await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': b''})
+        else:
+            headers += [(b'content-type', b'application/json'),
+                        (b'content-length', str(len(payload.body)).encode())]
+            await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+            body = b'' if scope['method'] == 'HEAD' else payload.body
+            await send({'type': 'http.response.body', 'body': body})
+        return True
+
+    def game_data(self):
+        with self.flask_app.app_context():
+            return cached_game_data()
+
+    def load_game_data(self):
+        with self.flask_app.app_context():
+            return get_game_data()
+
+    async def stream(self, scope, receive, send, char_id):
+        """Server-sent events for a character without holding a pool thread"""
+        broker = server.broker
+        headers = dict(scope['headers'])
+        last_event_id = parse_last_event_id(headers.get(b'last-event-id', b'').decode())
+        subscriber = AsyncSubscriber(asyncio.get_running_loop(), broker.max_queue)
+        broker.subscribe(char_id, last_event_id, subscriber)
+
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ]})
+            await send({'type': 'http.response.body', 'body': OPEN, 'more_body': True})
+            while not subscriber.overflowed and not disconnected.done():
+                next_message = asyncio.ensure_future(subscriber.queue.get())
+                done, _ = await asyncio.wait(
+                    (next_message, disconnected), timeout=HEARTBEAT_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if next_message in done:
+                    message = next_message.result()
+                else:
+                    next_message.cancel()
+                    if disconnected in done:
+                        break
+                    message = HEARTBEAT
+                await send({'type': 'http.response.body', 'body': message, 'more_body': True})
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            broker.unsubscribe(char_id, subscriber)
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+app = AsgiApp(server.app, max_threads=int(os.environ.get('ASGI_THREADS', 32)))
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("The ASGI server needs uvicorn: pip install uvicorn")
+    uvicorn.run(app, port=int(os.environ.get('PORT', 5000)))
@@ -0,0 +1,214 @@
+"""
+Balance sweep: every clan/role build at every level against every enemy.
+
+Builds a fresh SQLite database from database/schema.sql and seed_data.sql
+(or reads --db), creates each Clan x Role x level character the way
+/api/character/create does, and fights it against every EnemyTemplate with
+the simulator (simulation.py, the Combat rules vectorized). Builds are
+spread over a process pool, one task per build, so a sweep scales with the
+number of cores. Results are a win-rate/turn-count matrix written as CSV or
+JSON:
+
+    python balance_sweep.py --output sweep.csv
+    python balance_sweep.py --levels 1,5,10 --fights 20000 --output sweep.json
+    python balance_sweep.py --exact --output sweep.csv  # damage_model.py, no sampling
+
+Core stats don't grow with level yet, so a level changes which of the
+role's active skills the build has learned; the most recently unlocked one
+goes on the hotbar. Every cell draws from its own RNG stream, so results
+don't depend on the worker count.
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+DEFAULT_LEVELS = (1, 5, 10, 15, 20, 25)
+DEFAULT_FIGHTS = 5000
+
+# What select_hotbar_skill() reads off a CharacterSkill
+HotbarSlot = namedtuple('HotbarSlot', 'skill_id hotbar_slot skill')
+
+@dataclass(frozen=True, slots=True)
+class Build:
+    """One character to sweep: clan, role, level and its hotbar skill"""
+    clan: object  # ClanData
+    role: object  # RoleData
+    level: int
+    skill: object  # SkillData or None
+
+COLUMNS = (
+    'clan', 'role', 'level', 'skill', 'enemy_template_id', 'enemy', 'enemy_level',
+    'fights', 'win_rate', 'loss_rate', 'timeout_rate', 'mean_turns_to_kill', 'p50_damage_taken'
+)
+
+# ============================================
+# GAME DATA
+# ============================================
+
+def load_game_data(db_path):
+    """GameData read from a SQLite database file"""
+    from flask import Flask
+    from game_data import GameData, CONTENT_VERSION
+    from models import db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    db.init_app(app)
+    with app.app_context():
+        return GameData(CONTENT_VERSION).load()
+
+def learned_skill(game_data, role, level):
+    """The role's most recently unlocked active skill at this level, or None"""
+    learned = [s for s in game_data.skills.values()
+               if s.role_id == role.id and s.is_active and (s.unlock_level or 1) <= level]
+    return max(learned, key=lambda s: (s.unlock_level or 1, s.id), default=None)
+
+def sweep_builds(game_data, levels):
+    return [Build(clan, role, level, learned_skill(game_data, role, level))
+            for clan in game_data.clans.values()
+            for role in clan.roles
+            for level in levels]
+
+# ============================================
+# WORKERS
+# ============================================
+
+_templates = ()
+_options = {}
+
+def _init_worker(templates, options):
+    global _templates, _options
+    _templates, _options = templates, options
+
+def cell_stream(build, template):
+    """Stream number of one build/enemy cell, independent of scheduling"""
+    return (build.role.id * 1000 + build.level) * 1000 + template.id
+
+def run_build(build):
+    """Fight one build against every template; returns result rows"""
+    from damage_model import win_probability
+    from models import Character, Enemy
+    from simulation import simulate_fights
+
+    character = Character.from_role(f'{build.role.name} {build.level}', build.clan, build.role,
+                                    level=build.level)
+    skills = [HotbarSlot(build.skill.id, 1, build.skill)] if build.skill else []
+    rows = []
+    for template in _templates:
+        enemy = Enemy.from_template(template)
+        row = {
+            'clan': build.clan.name,
+            'role': build.role.name,
+            'level': build.level,
+            'skill': build.skill.name if build.skill else None,
+            'enemy_template_id': template.id,
+            'enemy': template.name,
+            'enemy_level': template.level
+        }
+        if _options['exact']:
+            # Turns to kill average won fights only, as in the sampled summary
+            odds = win_probability(character, enemy, skills, max_turns=_options['max_turns'])
+            row.update(fights=None, win_rate=odds.win, loss_rate=odds.loss, timeout_rate=odds.timeout,
+                       mean_turns_to_kill=odds.expected_turns_to_kill, p50_damage_taken=None)
+        else:
+            result = simulate_fights(character, enemy, skills, n_fights=_options['fights'],
+                                     max_turns=_options['max_turns'], seed=_options['seed'],
+                                     stream=cell_stream(build, template))
+            summary = result.summary()
+            row.update(fights=result.n_fights, win_rate=result.win_rate,
+                       loss_rate=result.losses / result.n_fights, timeout_rate=result.timeouts / result.n_fights,
+                       mean_turns_to_kill=summary['mean_turns_to_kill'],
+                       p50_damage_taken=summary['damage_taken'].get('p50'))
+        rows.append(row)
+    return rows
+
+def run_sweep(game_data, levels=DEFAULT_LEVELS, fights=DEFAULT_FIGHTS, max_turns=200, seed=0,
+              workers=None, exact=False):
+    """Rows for every build x template, in build order"""
+    templates = tuple(game_data.enemy_templates.values())
+    options = {'fights': fights, 'max_turns': max_turns, 'seed': seed, 'exact': exact}
+    builds = sweep_builds(game_data, levels)
+    if workers == 1:
+        _init_worker(templates, options)
+        results = map(run_build, builds)
+        return [row for rows in results for row in rows]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(templates, options)) as executor:
+        return [row for rows in executor.map(run_build, builds) for row in rows]
+
+# ============================================
+# OUTPUT
+# ============================================
+
+def write_csv(rows, stream):
+    writer = csv.DictWriter(stream, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+
+def write_output(rows, meta, path=None):
+    """CSV or JSON (by file extension) to path, CSV to stdout without one"""
+    if path is None:
+        write_csv(rows, sys.stdout)
+    elif Path(path).suffix.lower() == '.json':
+        Path(path).write_text(json.dumps({'meta': meta, 'rows': rows}, indent=2))
+    else:
+        with open(path, 'w', newline='') as f:
+            write_csv(rows, f)
+
+def parse_levels(text):
+    return tuple(sorted({int(level) for level in text.split(',') if level.strip()}))
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep every clan/role/level build against every enemy.')
+    parser.add_argument('--db', help='read game data from this database instead of building one from seed data')
+    parser.add_argument('--levels', type=parse_levels, default=DEFAULT_LEVELS,
+                        help='comma-separated levels (default: %(default)s)')
+    parser.add_argument('--fights', type=int, default=DEFAULT_FIGHTS, help='simulated fights per cell')
+    parser.add_argument('--max-turns', type=int, default=200, help='turn cap per fight (timeouts)')
+    parser.add_argument('--seed', type=int, default=0, help='base RNG seed')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--exact', action='store_true', help='exact odds from damage_model.py instead of sampling')
+    parser.add_argument('--output', help='CSV or .json file (default: CSV on stdout)')
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        if db_path is None:
+            from init_db import init_database
+            db_path = Path(tmp) / 'sweep.db'
+            with contextlib.redirect_stdout(io.StringIO()):
+                init_database(db_path)
+        game_data = load_game_data(db_path)
+
+    start = time.perf_counter()
+    rows = run_sweep(game_data, args.levels, args.fights, args.max_turns, args.seed, args.workers, args.exact)
+    elapsed = time.perf_counter() - start
+    meta = {
+        'levels': list(args.levels),
+        'fights': None if args.exact else args.fights,
+        'max_turns': args.max_turns,
+        'seed': args.seed,
+        'exact': args.exact,
+        'workers': args.workers or os.cpu_count(),
+        'cells': len(rows),
+        'seconds': round(elapsed, 2)
+    }
+    write_output(rows, meta, args.output)
+    print(f"{len(rows)} cells in {elapsed:.1f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+Benchmark suite for the Five Winds combat engine and API hot paths.
+
+Builds a fresh seeded SQLite database with init_db.py in a temp directory,
+then measures:
+    - execute_turn throughput (turns/sec)
+    - full fights run to victory or defeat (fights/sec)
+    - spawn selection (picks/sec)
+    - p50/p99 latency of /api/clans, /api/start_combat and /api/combat_action
+
+Results are written as JSON so runs can be diffed across commits:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --compare bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def latency_summary(samples):
+    """Latency stats in milliseconds"""
+    ms = [s * 1000 for s in samples]
+    return {
+        'requests': len(ms),
+        'p50_ms': round(percentile(ms, 50), 4),
+        'p99_ms': round(percentile(ms, 99), 4),
+        'mean_ms': round(statistics.fmean(ms), 4)
+    }
+
+def throughput(count, elapsed, unit):
+    return {unit: round(count / elapsed, 1), 'count': count, 'seconds': round(elapsed, 4)}
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_database(directory):
+    """Seeded database file created by init_db.py"""
+    from init_db import init_database
+
+    db_path = Path(directory) / 'bench.db'
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_database(db_path)
+    return db_path
+
+# ============================================
+# ENGINE BENCHMARKS
+# ============================================
+
+def combat_fixture(app, char_id, template_id):
+    """Character (with skills loaded), enemy template and combat profile, usable outside the request cycle"""
+    from game_data import get_game_data
+    from combat_profile import combat_profiles
+    from queries import load_character_for_combat
+
+    with app.app_context():
+        character = load_character_for_combat(char_id)
+        template = get_game_data().enemy_templates[template_id]
+        return character, template, list(character.skills), combat_profiles.get(character)
+
+def bench_turns(app, char_id, template_id, turns):
+    from combat import Combat
+    from models import Enemy
+
+    character, template, skills, profile = combat_fixture(app, char_id, template_id)
+    start_hp, start_chi = character.current_hp, character.current_chi
+    seed = 0
+    played = 0
+    start = time.perf_counter()
+    while played < turns:
+        character.current_hp, character.current_chi = start_hp, start_chi
+        combat = Combat(character, Enemy.from_template(template), skills, seed=seed, profile=profile)
+        while not combat.is_over and played < turns:
+            combat.execute_turn('attack')
+            played += 1
+        seed += 1
+    return throughput(played, time.perf_counter() - start, 'turns_per_sec')
+
+def bench_fights(app, char_id, template_id, fights):
+    from combat import Combat
+    from models import Enemy
+
+    character, template, skills, profile = combat_fixture(app, char_id, template_id)
+    start_hp, start_chi = character.current_hp, character.current_chi
+    start = time.perf_counter()
+    for seed in range(fights):
+        character.current_hp, character.current_chi = start_hp, start_chi
+        combat = Combat(character, Enemy.from_template(template), skills, seed=seed, profile=profile)
+        while not combat.is_over:
+            combat.play_turn('attack')
+    return throughput(fights, time.perf_counter() - start, 'fights_per_sec')
+
+def bench_spawns(app, picks):
+    from game_data import get_game_data
+    from rng import CombatRNG
+
+    with app.app_context():
+        tables = get_game_data().spawn_tables
+    rng = CombatRNG(0)
+    zones = list(tables.zones) + [None]  # None exercises the level fallback
+    start = time.perf_counter()
+    for i in range(picks):
+        tables.pick(zones[i % len(zones)], 5, rng)
+    return throughput(picks, time.perf_counter() - start, 'picks_per_sec')
+
+# ============================================
+# HTTP BENCHMARKS
+# ============================================
+
+def timed(fn):
+    start = time.perf_counter()
+    response = fn()
+    return time.perf_counter() - start, response
+
+def bench_http(client, char_id, requests):
+    results = {}
+
+    samples = [timed(lambda: client.get('/api/clans'))[0] for _ in range(requests)]
+    results['GET /api/clans'] = latency_summary(samples)
+
+    samples = [timed(lambda: client.post('/api/start_combat', json={'character_id': char_id}))[0]
+               for _ in range(requests)]
+    results['POST /api/start_combat'] = latency_summary(samples)
+
+    samples = []
+    client.post('/api/start_combat', json={'character_id': char_id})
+    while len(samples) < requests:
+        elapsed, response = timed(lambda: client.post(
+            '/api/combat_action', json={'character_id': char_id, 'action': 'attack'}
+        ))
+        samples.append(elapsed)
+        state = response.get_json()
+        if state.get('victory') or state.get('defeat') or state.get('error'):
+            # Start a fresh fight at full health so every sample is a real turn
+            client.post('/api/meditate', json={'character_id': char_id})
+            client.post('/api/start_combat', json={'character_id': char_id})
+    results['POST /api/combat_action'] = latency_summary(samples)
+
+    return results
+
+# ============================================
+# RUNNER
+# ============================================
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = build_database(tmp)
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        sys.path.insert(0, str(ROOT))
+
+        from server import app
+        from models import db, Character
+
+        with app.app_context():
+            db.create_all()  # tables init_db's SQLite conversion can't create
+        client = app.test_client()
+
+        response = client.post('/api/character/create', json={'name': 'BenchHero', 'clan_id': 1, 'role_id': 1})
+        char_id = response.get_json()['character']['id']
+        # Spawn from the Bamboo Forest for HTTP runs
+        with app.app_context():
+            db.session.get(Character, char_id).current_zone_id = 6
+            db.session.commit()
+
+        template_id = args.template
+        results = {
+            'execute_turn': bench_turns(app, char_id, template_id, args.turns),
+            'full_fights': bench_fights(app, char_id, template_id, args.fights),
+            'spawn_pick': bench_spawns(app, args.turns),
+        }
+        results.update(bench_http(client, char_id, args.requests))
+
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'params': {
+                'turns': args.turns,
+                'fights': args.fights,
+                'requests': args.requests,
+                'template': args.template
+            }
+        },
+        'results': results
+    }
+
+def compare(baseline, current):
+    """Print the change in every numeric metric against a saved run"""
+    print(f"{'benchmark':<32} {'metric':<16} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, metrics in current['results'].items():
+        old = baseline['results'].get(name, {})
+        for metric, value in metrics.items():
+            if metric in ('count', 'requests', 'seconds') or metric not in old:
+                continue
+            change = (value - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            print(f"{name:<32} {metric:<16} {old[metric]:>12} {value:>12} {change:>+8.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Five Winds combat engine and API.')
+    parser.add_argument('--turns', type=int, default=20000, help='turns for execute_turn/spawn benchmarks')
+    parser.add_argument('--fights', type=int, default=2000, help='fights for full-fight throughput')
+    parser.add_argument('--requests', type=int, default=300, help='requests per HTTP endpoint')
+    parser.add_argument('--template', type=int, default=2, help='enemy template id for engine benchmarks')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--compare', help='previous JSON results to compare against')
+    args = parser.parse_args()
+
+    report = run(args)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+    elif not args.output:
+        print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,13 @@
-import random
+import time
+from collections import namedtuple
 from dataclasses import dataclass
 from typing import Optional
 
+from combat_events import EventLog, event_to_dict, TURN, PLAYER_ATTACK, PLAYER_DEFEND, ENEMY_ATTACK, RAGE
+from combat_profile import character_profile, enemy_profile
+from combat_state import CombatState
+from rng import CombatRNG
+
 @dataclass
 class CombatResult:
     """Single turn result"""
@@ -12,13 +18,50 @@ class CombatResult:
     action_type: str  # 'attack', 'skill', 'defend'
     message: str
     chi_used: int = 0
+    skill_id: int = 0
+
+# Compact per-turn result for batch resolution; sent to clients as a plain list
+TurnOutcome = namedtuple('TurnOutcome', 'turn player_first player_damage enemy_damage character_hp enemy_hp character_chi')
+
+ACTIONS = ('attack', 'defend')
+MAX_BATCH_TURNS = 100
+
+# Real-time pacing (see scheduler.py): a combatant with speed 0 acts every
+# BASE_ATTACK_INTERVAL_MS, speed 20 twice as often
+BASE_ATTACK_INTERVAL_MS = 2000
+MIN_ATTACK_INTERVAL_MS = 250
+
+def attack_interval_ms(speed):
+    """Milliseconds between a combatant's real-time actions"""
+    return max(MIN_ATTACK_INTERVAL_MS, int(BASE_ATTACK_INTERVAL_MS * 20 / (20 + max(0, speed or 0))))
+
+def select_hotbar_skill(character_skills):
+    """First active skill equipped to the hotbar, or None for basic attacks"""
+    for char_skill in character_skills or []:
+        if char_skill.hotbar_slot and char_skill.skill.is_active:
+            return char_skill.skill
+    return None
 
 class Combat:
-    def __init__(self, character, enemy, character_skills=None):
+    def __init__(self, character, enemy, character_skills=None, seed=None, rng=None, profile=None):
         self.character = character
         self.enemy = enemy
         self.character_skills = character_skills or []
         
+        # Attacks read these precomputed numbers, never the ORM rows; pass
+        # a cached profile (combat_profile.combat_profiles) to skip the gear walk
+        self.profile = profile or character_profile(character)
+        self.enemy_profile = enemy_profile(enemy)
+        
+        # Every roll comes from this fight's own stream so it can be replayed
+        # from (seed, actions); pass rng to share a spawned/jumped stream
+        self.rng = rng or CombatRNG(seed)
+        self.seed = self.rng.seed
+        self.rng_start = self.rng.counter  # draws taken before the fight (e.g. the spawn roll)
+        self.actions = []
+        self.replayable = True
+        self.resumed_from = None  # the stored CombatState this fight was rebuilt from
+        
         # Current combat state
         self.character_hp = character.current_hp
         self.character_chi = character.current_chi
@@ -29,109 +72,101 @@ class Combat:
         self.rage_threshold = character.max_hp * 0.5
         
         self.turn_number = 1
-        self.log = []
+        self.started_at = int(time.time())
+        self.log = EventLog()
+        # get_state() reports events after this cursor unless told otherwise
+        self.log_cursor = 0
+        # Real-time mode only: skill_id -> clock time (ms) it is ready again
+        self.cooldowns = {}
+        self.turn_open = False  # TURN already logged for turn_number
     
     def calculate_initiative(self):
         """Who goes first this turn"""
-        char_speed = self.character.flow + random.randint(1, 10)
-        enemy_speed = self.enemy.agility + random.randint(1, 10)
+        char_speed = self.profile.flow + self.rng.randint(1, 10)
+        enemy_speed = self.enemy_profile.flow + self.rng.randint(1, 10)
         return char_speed >= enemy_speed
     
-    def basic_attack(self, attacker, defender, attacker_stats, skill=None):
-        """Physical attack using skill or basic attack"""
+    def basic_attack(self, attacker, defender, skill=None, chi=0):
+        """Physical attack using skill or basic attack; attacker/defender are CombatProfiles"""
         chi_cost = 0
         
-        # Use skill if provided and character has enough chi
-        if skill and hasattr(attacker, 'current_chi'):
-            if attacker.current_chi >= skill.chi_cost:
-                weapon_damage = random.randint(skill.base_damage_min, skill.base_damage_max)
-                chi_cost = skill.chi_cost
-                attacker.current_chi -= chi_cost
-            else:
-                # Not enough chi, use basic attack
-                skill = None
-                weapon_damage = random.randint(8, 12)
+        # Use skill if provided and the attacker has enough chi
+        if skill and chi >= skill.chi_cost:
+            weapon_damage = self.rng.randint(skill.base_damage_min, skill.base_damage_max)
+            chi_cost = skill.chi_cost
         else:
-            weapon_damage = random.randint(8, 12)
+            # No skill or not enough chi: basic attack with the equipped weapon
+            skill = None
+            weapon_damage = self.rng.randint(attacker.damage_min, attacker.damage_max)
         
         # Calculate damage
-        stat_multiplier = attacker_stats.get('spirit', 10) if (skill and skill.skill_type == 'chi_kung') else attacker_stats.get('body', 10)
+        stat_multiplier = attacker.spirit if (skill and skill.skill_type == 'chi_kung') else attacker.body
         base_damage = stat_multiplier * (weapon_damage / 10)
         
         # Critical hit chance
-        crit_chance = (attacker_stats.get('flow', 10) / 100) + 0.05
-        is_crit = random.random() < crit_chance
+        is_crit = self.rng.random() < attacker.crit_chance
         
         if is_crit:
             base_damage *= 2
         
         # Apply defense
-        defense_val = getattr(defender, 'defense', 5)
-        final_damage = max(1, int(base_damage - defense_val))
+        final_damage = max(1, int(base_damage + attacker.damage_bonus - defender.defense))
         
-        attacker_name = attacker.name if hasattr(attacker, 'name') else "Enemy"
-        defender_name = defender.name if hasattr(defender, 'name') else "Enemy"
         skill_name = skill.name if skill else "Basic Attack"
 
         return CombatResult(
             damage=final_damage,
             is_crit=is_crit,
-            attacker_name=attacker_name,
-            defender_name=defender_name,
+            attacker_name=attacker.name,
+            defender_name=defender.name,
             action_type='skill' if skill else 'attack',
             message=f"{skill_name}: {'Critical hit! ' if is_crit else ''}{final_damage} damage",
-            chi_used=chi_cost
+            chi_used=chi_cost,
+            skill_id=skill.id if skill else 0
         )
     
-    def character_turn(self, action='attack'):
-        """Player's turn"""
+    def ready_skill(self, now_ms):
+        """First active hotbar skill off cooldown at now_ms, or None"""
+        for char_skill in self.character_skills:
+            skill = char_skill.skill
+            if char_skill.hotbar_slot and skill.is_active and self.cooldowns.get(skill.id, 0) <= now_ms:
+                return skill
+        return None
+    
+    def character_turn(self, action='attack', now_ms=None):
+        """Player's turn; with now_ms (real-time mode) skills respect their cooldowns"""
         if action == 'attack':
-            attacker_stats = {
-                'body': self.character.body,
-                'spirit': self.character.spirit,
-                'flow': self.character.flow
-            }
-            
             # Try to use the first equipped skill
-            skill = None
-            if self.character_skills:
-                for char_skill in self.character_skills:
-                    if char_skill.hotbar_slot and char_skill.skill.is_active:
-                        skill = char_skill.skill
-                        break
+            if now_ms is None:
+                skill = select_hotbar_skill(self.character_skills)
+            else:
+                skill = self.ready_skill(now_ms)
             
             result = self.basic_attack(
-                self.character,
-                self.enemy,
-                attacker_stats,
-                skill=skill
+                self.profile,
+                self.enemy_profile,
+                skill=skill,
+                chi=self.character_chi
             )
             
             self.enemy_hp -= result.damage
-            self.character_chi = self.character.current_chi
+            self.character_chi -= result.chi_used
+            if now_ms is not None and result.skill_id:
+                self.cooldowns[result.skill_id] = now_ms + (skill.cooldown_ms or 0)
             
-            chi_msg = f" (-{result.chi_used} Chi)" if result.chi_used > 0 else ""
-            self.log.append(f"You use {result.message}{chi_msg}")
+            self.log.append(PLAYER_ATTACK, self.turn_number, result.damage,
+                            result.chi_used, result.is_crit, result.skill_id)
             
             return result
         
         elif action == 'defend':
             # TODO: Implement defense boost
-            self.log.append("You take a defensive stance")
+            self.log.append(PLAYER_DEFEND, self.turn_number)
             return None
     
     def enemy_turn(self):
         """Enemy's turn"""
-        enemy_stats = {
-            'body': self.enemy.attack_power // 2,
-            'flow': self.enemy.agility
-        }
-        
-        result = self.basic_attack(
-            self.enemy,
-            self.character,
-            enemy_stats
-        )
+        result = self.basic_attack(self.enemy_profile, self.profile)
         
         self.character_hp -= result.damage
         self.wounds += result.damage
@@ -139,33 +174,164 @@ class Combat:
         # Check rage activation
         if self.wounds >= self.rage_threshold and not self.rage_active:
             self.rage_active = True
-            self.log.append("🔥 RAGE ACTIVATED!")
+            self.log.append(RAGE, self.turn_number)
         
-        self.log.append(f"{self.enemy.name} attacks for {result.damage} damage")
+        self.log.append(ENEMY_ATTACK, self.turn_number, result.damage, is_crit=result.is_crit)
         
         return result
     
-    def execute_turn(self, player_action='attack'):
-        """Full turn cycle"""
+    @property
+    def is_over(self):
+        return self.enemy_hp <= 0 or self.character_hp <= 0
+    
+    def play_turn(self, player_action='attack'):
+        """Resolve one full turn and return its TurnOutcome"""
+        self.actions.append(player_action)
         player_first = self.calculate_initiative()
+        turn = self.turn_number
+        player_result = enemy_result = None
         
-        self.log.append(f"\n--- Turn {self.turn_number} ---")
+        self.log.append(TURN, turn)
         
         if player_first:
-            self.character_turn(player_action)
+            player_result = self.character_turn(player_action)
             if self.enemy_hp > 0:
-                self.enemy_turn()
+                enemy_result = self.enemy_turn()
         else:
-            self.enemy_turn()
+            enemy_result = self.enemy_turn()
             if self.character_hp > 0:
-                self.character_turn(player_action)
+                player_result = self.character_turn(player_action)
         
         self.turn_number += 1
         
+        return TurnOutcome(
+            turn,
+            player_first,
+            player_result.damage if player_result else 0,
+            enemy_result.damage if enemy_result else 0,
+            self.character_hp,
+            self.enemy_hp,
+            self.character_chi
+        )
+    
+    def execute_turn(self, player_action='attack'):
+        """Full turn cycle"""
+        self.play_turn(player_action)
         return self.get_state()
     
-    def get_state(self):
-        """Current combat state"""
+    def run_actions(self, actions):
+        """Play a list of actions until they run out or the fight ends"""
+        outcomes = []
+        for action in actions[:MAX_BATCH_TURNS]:
+            if self.is_over:
+                break
+            outcomes.append(self.play_turn(action))
+        return outcomes
+    
+    def auto_battle(self, hp_threshold=0.0, max_turns=MAX_BATCH_TURNS):
+        """Attack until victory, defeat, max_turns, or HP falls to hp_threshold of max"""
+        outcomes = []
+        stop_hp = self.character.max_hp * hp_threshold
+        while not self.is_over and len(outcomes) < min(max_turns, MAX_BATCH_TURNS):
+            if self.character_hp <= stop_hp:
+                break
+            outcomes.append(self.play_turn('attack'))
+        return outcomes
+    
+    def action_interval_ms(self, actor):
+        """Real-time gap between actions for 'character' or 'enemy'"""
+        speed = self.profile.flow if actor == 'character' else self.enemy_profile.flow
+        return attack_interval_ms(speed)
+    
+    def act(self, actor, now_ms, action='attack'):
+        """One real-time action by 'character' or 'enemy' at clock time now_ms.
+
+        A turn runs up to and including the character's action, so enemy
+        strikes in between belong to the character's next turn.
+        """
+        if not self.turn_open:
+            self.log.append(TURN, self.turn_number)
+            self.turn_open = True
+        if actor == 'character':
+            self.actions.append(action)
+            self.character_turn(action, now_ms)
+            self.turn_number += 1
+            self.turn_open = False
+        else:
+            self.enemy_turn()
+    
+    @classmethod
+    def replay(cls, character, enemy, seed, actions, character_skills=None, profile=None,
+               stream=0, counter=0):
+        """Rebuild a turn-based fight by re-running its actions from the same
+        seed (and stream/counter, see CombatState.rng_start).
+
+        The character must be in the state it started the fight with, and
+        the fight's CombatState must be replayable (not played in real
+        time, and no more than MAX_ACTIONS turns).
+        """
+        combat = cls(character, enemy, character_skills, rng=CombatRNG(seed, stream, counter), profile=profile)
+        for action in actions:
+            combat.execute_turn(action)
+        return combat
+    
+    def to_state(self):
+        """Compact CombatState for a CombatStore (no ORM objects)"""
+        seed, stream, counter = self.rng.getstate()
+        replayable = self.replayable and len(self.actions) <= CombatState.MAX_ACTIONS
+        return CombatState(
+            character_id=self.character.id,
+            enemy_template_id=self.enemy.template_id,
+            character_hp=self.character_hp,
+            character_chi=self.character_chi,
+            enemy_hp=self.enemy_hp,
+            wounds=self.wounds,
+            rage_active=self.rage_active,
+            turn=self.turn_number,
+            rng_seed=seed,
+            rng_stream=stream,
+            rng_counter=counter,
+            # Only active hotbar skills can be used in a fight
+            skill_ids=[cs.skill_id for cs in self.character_skills if cs.hotbar_slot and cs.skill.is_active],
+            log_seq=self.log.last_seq,
+            log_events=tuple(self.log.events),
+            started_at=self.started_at,
+            rng_start=self.rng_start,
+            # Past MAX_ACTIONS the fight is kept without its action history
+            actions=bytes(ACTIONS.index(action) for action in self.actions) if replayable else b'',
+            replayable=replayable
+        )
+    
+    @classmethod
+    def from_state(cls, state, character, enemy, character_skills=None, profile=None):
+        """Resume a stored fight around freshly loaded character/enemy objects"""
+        skill_ids = set(state.skill_ids)
+        character_skills = [cs for cs in character_skills or [] if cs.skill_id in skill_ids]
+        
+        rng = CombatRNG(state.rng_seed, state.rng_stream, state.rng_counter)
+        combat = cls(character, enemy, character_skills, rng=rng, profile=profile)
+        combat.character_hp = state.character_hp
+        combat.character_chi = state.character_chi
+        combat.enemy_hp = state.enemy_hp
+        combat.wounds = state.wounds
+        combat.rage_active = state.rage_active
+        combat.turn_number = state.turn
+        combat.log = EventLog(last_seq=state.log_seq, events=state.log_events)
+        combat.log_cursor = state.log_seq
+        combat.started_at = state.started_at
+        combat.rng_start = state.rng_start
+        combat.actions = [ACTIONS[code] for code in state.actions]
+        combat.replayable = state.replayable
+        combat.resumed_from = state
+        return combat
+    
+    def skill_names(self):
+        return {cs.skill_id: cs.skill.name for cs in self.character_skills}
+    
+    def get_state(self, since=None):
+        """Current combat state with log events after `since` (default: this request's)"""
+        cursor = self.log_cursor if since is None else since
+        skill_names = self.skill_names()
         return {
             'character_hp': self.character_hp,
             'character_max_hp': self.character.max_hp,
@@ -177,7 +343,8 @@ class Combat:
             'wounds': self.wounds,
             'rage_active': self.rage_active,
             'turn': self.turn_number,
-            'log': self.log.copy(),
+            'events': [event_to_dict(e, skill_names) for e in self.log.since(cursor)],
+            'log_cursor': self.log.last_seq,
             'victory': self.enemy_hp <= 0,
             'defeat': self.character_hp <= 0
         }
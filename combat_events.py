@@ -0,0 +1,84 @@
+"""
+Structured combat log.
+
+Each fight keeps its log as a bounded ring buffer of numeric events with
+increasing sequence numbers. Clients pass back the last sequence number
+they have seen and receive only newer events, and render them from the
+event type and numbers instead of parsing text.
+"""
+
+import struct
+from collections import deque, namedtuple
+
+DEFAULT_CAPACITY = 16
+
+# Event types
+TURN = 1
+PLAYER_ATTACK = 2
+PLAYER_DEFEND = 3
+ENEMY_ATTACK = 4
+RAGE = 5
+
+EVENT_NAMES = {
+    TURN: 'turn',
+    PLAYER_ATTACK: 'player_attack',
+    PLAYER_DEFEND: 'player_defend',
+    ENEMY_ATTACK: 'enemy_attack',
+    RAGE: 'rage'
+}
+
+CombatEvent = namedtuple('CombatEvent', 'seq kind turn damage chi_used is_crit skill_id')
+
+# seq, kind, crit flag, turn, damage, chi used, skill id
+EVENT_FORMAT = struct.Struct('<IBBHiHI')
+
+class EventLog:
+    """Ring buffer of the most recent CombatEvents"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, last_seq=0, events=()):
+        self.events = deque(events, maxlen=capacity)
+        self.last_seq = last_seq
+
+    def append(self, kind, turn, damage=0, chi_used=0, is_crit=False, skill_id=0):
+        self.last_seq += 1
+        event = CombatEvent(self.last_seq, kind, turn, damage, chi_used, is_crit, skill_id)
+        self.events.append(event)
+        return event
+
+    def since(self, cursor):
+        """Events with seq > cursor that are still in the buffer"""
+        return [event for event in self.events if event.seq > cursor]
+
+    def encode(self):
+        return b''.join(
+            EVENT_FORMAT.pack(e.seq, e.kind, int(e.is_crit), e.turn, e.damage, e.chi_used, e.skill_id)
+            for e in self.events
+        )
+
+    @staticmethod
+    def decode_events(data, count, offset=0):
+        events = []
+        for i in range(count):
+            seq, kind, crit, turn, damage, chi_used, skill_id = EVENT_FORMAT.unpack_from(
+                data, offset + i * EVENT_FORMAT.size
+            )
+            events.append(CombatEvent(seq, kind, turn, damage, chi_used, bool(crit), skill_id))
+        return events
+
+    def __len__(self):
+        return len(self.events)
+
+def event_to_dict(event, skill_names=None):
+    """JSON form of an event for the combat API"""
+    data = {
+        'seq': event.seq,
+        'type': EVENT_NAMES[event.kind],
+        'turn': event.turn
+    }
+    if event.kind in (PLAYER_ATTACK, ENEMY_ATTACK):
+        data['damage'] = event.damage
+        data['crit'] = event.is_crit
+    if event.kind == PLAYER_ATTACK:
+        data['chi_used'] = event.chi_used
+        data['skill'] = (skill_names or {}).get(event.skill_id) if event.skill_id else None
+    return data
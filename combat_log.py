@@ -0,0 +1,129 @@
+"""
+Append-only fight history in the combat_log table.
+
+Finished fights are buffered in memory by a CombatLogWriter and inserted
+with one executemany per batch from a background thread, so recording
+history costs combat_action a list append. win_rates() rolls the table up
+into hourly win rates per zone or per enemy for analytics.
+"""
+
+import atexit
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, func
+
+from models import db, CombatLog
+from persistence import BackgroundFlusher
+
+def _utc(timestamp):
+    """Naive UTC datetime for a unix timestamp, matching the models' utcnow defaults"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+class CombatLogWriter:
+    """Buffered, batched writer for combat_log rows"""
+
+    def __init__(self, app=None, flush_interval=2.0, batch_size=200, max_buffer=10000):
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.app = None
+        self.dropped = 0  # rows discarded because the buffer was full
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flusher = BackgroundFlusher(self.flush, flush_interval, 'combat-log')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self._flusher.app = app
+        self._flusher.interval = app.config.get('COMBAT_LOG_INTERVAL', self._flusher.interval)
+        self.batch_size = app.config.get('COMBAT_LOG_BATCH_SIZE', self.batch_size)
+        atexit.register(self.stop)
+
+    def record(self, character_id, enemy_template_id, zone_id, result,
+               xp_gained=0, gold_gained=0, loot_gained=None, started_at=None, ended_at=None):
+        """Queue one finished fight; timestamps are unix seconds"""
+        end = _utc(ended_at) if ended_at else datetime.utcnow()
+        row = {
+            'character_id': character_id,
+            'enemy_template_id': enemy_template_id,
+            'zone_id': zone_id,
+            'result': result,
+            'xp_gained': xp_gained,
+            'gold_gained': gold_gained,
+            'loot_gained': json.dumps(loot_gained) if loot_gained is not None else None,
+            'combat_start': _utc(started_at) if started_at else end,
+            'combat_end': end
+        }
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                # History is best-effort; never let it grow without bound
+                self.dropped += 1
+                return
+            self._buffer.append(row)
+            buffered = len(self._buffer)
+        self._flusher.ensure_started()
+        if buffered >= self.batch_size:
+            self._flusher.wake()
+
+    def flush(self):
+        """Insert everything buffered in one transaction; returns rows written"""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(CombatLog.__table__.insert(), rows)
+        except Exception:
+            with self._lock:
+                self._buffer = (rows + self._buffer)[:self.max_buffer]
+            raise
+        return len(rows)
+
+    def stop(self):
+        """Stop the background thread and write what's left"""
+        self._flusher.stop()
+        if self.app is not None:
+            self.flush()
+
+    def __len__(self):
+        return len(self._buffer)
+
+# ============================================
+# ROLLUPS
+# ============================================
+
+ROLLUP_KEYS = {
+    'zone': CombatLog.zone_id,
+    'enemy': CombatLog.enemy_template_id
+}
+
+def _hour_bucket(column):
+    if db.engine.dialect.name == 'sqlite':
+        return func.strftime('%Y-%m-%d %H:00:00', column)
+    return func.date_trunc('hour', column)
+
+def win_rates(by='zone', hours=24, now=None):
+    """Fights, victories and win rate per hour per zone or enemy template"""
+    key = ROLLUP_KEYS[by]
+    now = now or datetime.utcnow()
+    hour = _hour_bucket(CombatLog.combat_end).label('hour')
+    victories = func.sum(case((CombatLog.result == 'victory', 1), else_=0)).label('victories')
+
+    rows = db.session.query(
+        hour, key.label('key'), func.count(CombatLog.id).label('fights'), victories
+    ).filter(
+        CombatLog.combat_end >= now - timedelta(hours=hours)
+    ).group_by(hour, key).order_by(hour, key).all()
+
+    return [{
+        'hour': str(row.hour),
+        f'{by}_id': row.key,
+        'fights': row.fights,
+        'victories': row.victories,
+        'win_rate': round(row.victories / row.fights, 4)
+    } for row in rows]
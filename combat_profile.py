@@ -0,0 +1,191 @@
+"""
+Precomputed combat profiles.
+
+A CombatProfile folds a combatant's core stats, equipped gear (refinement
+and ornaments included) and active epithet into the plain numbers the
+combat engines read on every attack: effective Body/Spirit/Flow, crit
+chance, defense, basic attack roll and flat damage bonus. Building one walks
+the character's equipment, so ProfileCache keeps one per character and only
+rebuilds it when its stats or active epithet change (checked on every get)
+or when a transaction that wrote one of the character's inventory rows
+commits (ORM events mark the character at flush; a rollback drops the
+mark), so no request rebuilds a profile from gear that isn't committed.
+
+Rows written with raw SQL in another process aren't seen by the events;
+call combat_profiles.invalidate(char_id) after such writes.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import CharacterInventory
+from queries import load_character_gear
+
+# Unarmed / enemy basic attack roll
+BASIC_DAMAGE_MIN = 8
+BASIC_DAMAGE_MAX = 12
+# Each refinement level adds 10% to an item's weapon damage and defense
+REFINEMENT_STEP = 0.1
+
+@dataclass(frozen=True, slots=True)
+class CombatProfile:
+    name: str
+    body: int
+    spirit: int
+    flow: int
+    max_hp: int
+    max_chi: int
+    defense: int
+    dodge: int
+    damage_min: int  # basic attack roll
+    damage_max: int
+    damage_bonus: int  # flat, added before defense
+    crit_chance: float
+
+def character_profile(character, equipped=None, epithet=None):
+    """CombatProfile from core stats, equipped items and the active epithet.
+
+    Without equipped/epithet, reads the character's inventory and
+    active_epithet relationships (objects without them fight unequipped).
+    """
+    if equipped is None:
+        equipped = [inv for inv in getattr(character, 'inventory', None) or () if inv.equipped_slot]
+    if epithet is None:
+        epithet = getattr(character, 'active_epithet', None)
+
+    body, spirit, flow = character.body, character.spirit, character.flow
+    defense = dodge = damage_bonus = 0
+    damage_min, damage_max = BASIC_DAMAGE_MIN, BASIC_DAMAGE_MAX
+
+    for inv in equipped:
+        item = inv.item
+        scale = 1 + REFINEMENT_STEP * (inv.refinement_level or 0)
+        if item.item_type == 'weapon' and item.damage_max:
+            damage_min = int((item.damage_min or 0) * scale)
+            damage_max = int(item.damage_max * scale)
+        defense += int((item.defense or 0) * scale)
+        dodge += item.dodge or 0
+        # Socketed ornaments add their full stats, unrefined
+        ornaments = [o for o in (inv.ornament_1, inv.ornament_2) if o is not None]
+        for ornament in ornaments:
+            defense += ornament.defense or 0
+            dodge += ornament.dodge or 0
+        for template in (item, *ornaments):
+            body += template.body_bonus or 0
+            spirit += template.spirit_bonus or 0
+            flow += template.flow_bonus or 0
+
+    if epithet is not None:
+        body += epithet.body_bonus or 0
+        spirit += epithet.spirit_bonus or 0
+        flow += epithet.flow_bonus or 0
+        damage_bonus += epithet.damage_bonus or 0
+        defense += epithet.defense_bonus or 0
+
+    return CombatProfile(
+        name=character.name,
+        body=body,
+        spirit=spirit,
+        flow=flow,
+        max_hp=100 + body * 10,
+        max_chi=100 + spirit * 10,
+        defense=5 + body // 2 + defense,
+        dodge=flow // 2 + dodge,
+        damage_min=damage_min,
+        damage_max=damage_max,
+        damage_bonus=damage_bonus,
+        crit_chance=flow / 100 + 0.05
+    )
+
+def enemy_profile(enemy):
+    """CombatProfile for an Enemy: attacks scale with half its attack power"""
+    return CombatProfile(
+        name=enemy.name,
+        body=enemy.attack_power // 2,
+        spirit=10,
+        flow=enemy.agility,
+        max_hp=enemy.max_hp,
+        max_chi=0,
+        defense=5 if enemy.defense is None else enemy.defense,
+        dodge=enemy.agility,
+        damage_min=BASIC_DAMAGE_MIN,
+        damage_max=BASIC_DAMAGE_MAX,
+        damage_bonus=0,
+        crit_chance=enemy.agility / 100 + 0.05
+    )
+
+# ============================================
+# CACHE
+# ============================================
+
+def _stats_key(character):
+    return (character.body, character.spirit, character.flow, character.active_epithet_id)
+
+class ProfileCache:
+    """Thread-safe CombatProfile per character id, least recently used evicted first"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._profiles = OrderedDict()  # char_id -> (stats key, CombatProfile)
+        self._lock = threading.Lock()
+
+    def get(self, character):
+        """The character's profile, rebuilt (one gear query) if missing or stale"""
+        if character.id is None:
+            return character_profile(character)
+        key = _stats_key(character)
+        with self._lock:
+            entry = self._profiles.get(character.id)
+            if entry is not None and entry[0] == key:
+                self._profiles.move_to_end(character.id)
+                return entry[1]
+
+        profile = character_profile(character, *load_character_gear(character))
+        with self._lock:
+            self._profiles[character.id] = (key, profile)
+            self._profiles.move_to_end(character.id)
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+        return profile
+
+    def invalidate(self, char_id):
+        with self._lock:
+            self._profiles.pop(char_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def __len__(self):
+        return len(self._profiles)
+
+combat_profiles = ProfileCache()
+
+# session.info key: ids of characters whose inventory this transaction flushed
+DIRTY_PROFILES = 'dirty_combat_profiles'
+
+@event.listens_for(CharacterInventory, 'after_insert')
+@event.listens_for(CharacterInventory, 'after_update')
+@event.listens_for(CharacterInventory, 'after_delete')
+def _inventory_changed(mapper, connection, target):
+    # Equipping, refining or socketing changes the owner's profile once committed
+    session = object_session(target)
+    if session is None:
+        combat_profiles.invalidate(target.character_id)
+        return
+    session.info.setdefault(DIRTY_PROFILES, set()).add(target.character_id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    for char_id in session.info.pop(DIRTY_PROFILES, ()):
+        combat_profiles.invalidate(char_id)
+
+@event.listens_for(Session, 'after_transaction_end')
+def _forget_rolled_back(session, transaction):
+    # The outermost transaction ended without committing (after_commit pops the marks first)
+    if transaction.parent is None:
+        session.info.pop(DIRTY_PROFILES, None)
@@ -0,0 +1,121 @@
+"""
+Compact snapshot of a live fight.
+
+CombatState holds only the numbers needed to resume a Combat - no ORM
+objects and no log text - and packs into a versioned little-endian record:
+a fixed 190-byte core followed by the fight's event ring buffer (16
+events of 18 bytes by default) and its actions so far (one byte each, at
+most MAX_ACTIONS), about 1.5 KB at most. Cheap to keep in a
+CombatStore, ship between workers or checkpoint; the actions and starting
+RNG position let Combat.replay rebuild the fight. A fight with more actions
+than fit is stored without them and marked not replayable.
+"""
+
+import struct
+
+from combat_events import EventLog, EVENT_FORMAT
+
+class CombatState:
+    """Resumable fight state (see Combat.to_state / Combat.from_state)"""
+    __slots__ = (
+        'character_id', 'enemy_template_id',
+        'character_hp', 'character_chi', 'enemy_hp', 'wounds',
+        'rage_active', 'turn',
+        'rng_seed', 'rng_stream', 'rng_counter',
+        'skill_ids', 'log_seq', 'log_events', 'started_at',
+        'rng_start', 'actions', 'replayable'
+    )
+
+    VERSION = 1
+    MAX_SKILLS = 30  # 10 hotbar slots x 3 pages
+    MAX_ACTIONS = 1024
+    FLAG_RAGE = 0x01
+    FLAG_NOT_REPLAYABLE = 0x02
+
+    # version, flags, character_id, enemy_template_id, hp, chi, enemy_hp, wounds,
+    # turn, rng seed/stream/counter, skill count, skill ids, log seq, start time,
+    # rng counter at the start of the fight, action count, event count
+    _FORMAT = struct.Struct(f'<BBIIiiiiIQIQB{MAX_SKILLS}IIIQHB')
+    SIZE = _FORMAT.size
+
+    def __init__(self, character_id, enemy_template_id, character_hp, character_chi,
+                 enemy_hp, wounds=0, rage_active=False, turn=1,
+                 rng_seed=0, rng_stream=0, rng_counter=0, skill_ids=(),
+                 log_seq=0, log_events=(), started_at=0, rng_start=0, actions=b'', replayable=True):
+        if len(skill_ids) > self.MAX_SKILLS:
+            raise ValueError(f"At most {self.MAX_SKILLS} skills fit in a CombatState")
+        if len(actions) > self.MAX_ACTIONS:
+            raise ValueError(f"At most {self.MAX_ACTIONS} actions fit in a CombatState")
+        self.character_id = character_id
+        self.enemy_template_id = enemy_template_id
+        self.character_hp = character_hp
+        self.character_chi = character_chi
+        self.enemy_hp = enemy_hp
+        self.wounds = wounds
+        self.rage_active = rage_active
+        self.turn = turn
+        self.rng_seed = rng_seed
+        self.rng_stream = rng_stream
+        self.rng_counter = rng_counter
+        self.skill_ids = tuple(skill_ids)
+        self.log_seq = log_seq
+        self.log_events = tuple(log_events)
+        self.started_at = started_at  # unix seconds
+        self.rng_start = rng_start  # rng_counter before the first turn
+        self.actions = bytes(actions)  # index into combat.ACTIONS per turn played
+        self.replayable = replayable  # False when actions can't rebuild the fight
+
+    def encode(self):
+        padded = self.skill_ids + (0,) * (self.MAX_SKILLS - len(self.skill_ids))
+        flags = (self.FLAG_RAGE if self.rage_active else 0) | (0 if self.replayable else self.FLAG_NOT_REPLAYABLE)
+        return self._FORMAT.pack(
+            self.VERSION,
+            flags,
+            self.character_id,
+            self.enemy_template_id,
+            self.character_hp,
+            self.character_chi,
+            self.enemy_hp,
+            self.wounds,
+            self.turn,
+            self.rng_seed,
+            self.rng_stream,
+            self.rng_counter,
+            len(self.skill_ids),
+            *padded,
+            self.log_seq,
+            self.started_at,
+            self.rng_start,
+            len(self.actions),
+            len(self.log_events)
+        ) + EventLog(events=self.log_events).encode() + self.actions
+
+    @classmethod
+    def decode(cls, data):
+        version = data[0] if data else None
+        if version != cls.VERSION:
+            raise ValueError(f"Unsupported CombatState version: {version}")
+
+        (_, flags, character_id, enemy_template_id, character_hp, character_chi,
+         enemy_hp, wounds, turn, rng_seed, rng_stream, rng_counter,
+         skill_count, *rest) = cls._FORMAT.unpack_from(data)
+        skill_ids = rest[:skill_count]
+        log_seq, started_at, rng_start, action_count, event_count = rest[cls.MAX_SKILLS:]
+        log_events = EventLog.decode_events(data, event_count, cls.SIZE)
+        offset = cls.SIZE + event_count * EVENT_FORMAT.size
+        return cls(
+            character_id, enemy_template_id, character_hp, character_chi,
+            enemy_hp, wounds, bool(flags & cls.FLAG_RAGE), turn,
+            rng_seed, rng_stream, rng_counter, skill_ids,
+            log_seq, log_events, started_at, rng_start, data[offset:offset + action_count],
+            not (flags & cls.FLAG_NOT_REPLAYABLE)
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, CombatState):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return (f"CombatState(character_id={self.character_id}, enemy_template_id={self.enemy_template_id}, "
+                f"hp={self.character_hp}, enemy_hp={self.enemy_hp}, turn={self.turn})")
@@ -0,0 +1,251 @@
+"""
+Combat session storage for Five Winds.
+
+Live fights are kept as compact CombatState records keyed by character id
+instead of Combat objects holding ORM instances, so any worker process can
+pick up any fight and the server can restart without losing them.
+
+put() and delete() take the record a request loaded as `expected` and only
+write if it is still the stored one (compare-and-swap), so when two
+requests race on the same fight exactly one of them advances or settles it.
+lock() goes further and serializes whole requests for one character (turns,
+travel, meditation) in every thread and, with the SQLite store, every
+worker process - whichever server runs the app.
+
+Backends:
+    MemoryCombatStore - per-process LRU with idle TTL (development, single worker)
+    SQLiteCombatStore - shared SQLite file, safe across gunicorn workers
+"""
+
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from combat_state import CombatState
+
+DEFAULT_TTL = 30 * 60  # seconds before an untouched fight is abandoned
+DEFAULT_MAX_ENTRIES = 10_000
+LOCK_TIMEOUT = 5.0  # seconds to wait for another request on the same character
+LOCK_LEASE = 30.0  # seconds before a lock left by a crashed worker can be taken over
+
+class CharacterBusy(Exception):
+    """Another request held the character's lock for longer than LOCK_TIMEOUT"""
+
+class CombatStore:
+    """Interface for combat session backends"""
+
+    def get(self, character_id):
+        """CombatState of the character's active fight, or None"""
+        raise NotImplementedError
+
+    def put(self, character_id, state, expected=None):
+        """Store state; with expected, only if that is still the stored state. Returns whether it was stored"""
+        raise NotImplementedError
+
+    def delete(self, character_id, expected=None):
+        """Remove the fight; with expected, only if that is still the stored state. Returns whether it was removed"""
+        raise NotImplementedError
+
+    def purge_expired(self):
+        """Drop abandoned fights, returning how many were removed"""
+        raise NotImplementedError
+
+    def lock(self, character_id, timeout=LOCK_TIMEOUT):
+        """Context manager holding the character's lock; raises CharacterBusy after timeout"""
+        raise NotImplementedError
+
+    def __contains__(self, character_id):
+        return self.get(character_id) is not None
+
+class MemoryCombatStore(CombatStore):
+    """In-process store bounded by entry count (LRU) and idle time (TTL)"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # character_id -> (last_used, state)
+        self._lock = threading.Lock()
+        self._character_locks = weakref.WeakValueDictionary()
+
+    def get(self, character_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(character_id)
+            if entry is None:
+                return None
+            if now - entry[0] > self.ttl:
+                del self._entries[character_id]
+                return None
+            self._entries[character_id] = (now, entry[1])
+            self._entries.move_to_end(character_id)
+            return entry[1]
+
+    def _is_stored(self, character_id, expected):
+        entry = self._entries.get(character_id)
+        return entry is not None and entry[1] is expected
+
+    def put(self, character_id, state, expected=None):
+        with self._lock:
+            if expected is not None and not self._is_stored(character_id, expected):
+                return False
+            self._entries[character_id] = (time.monotonic(), state)
+            self._entries.move_to_end(character_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, character_id, expected=None):
+        with self._lock:
+            if expected is not None and not self._is_stored(character_id, expected):
+                return False
+            return self._entries.pop(character_id, None) is not None
+
+    def purge_expired(self):
+        cutoff = time.monotonic() - self.ttl
+        removed = 0
+        with self._lock:
+            # Entries are in last-used order, so stop at the first live one
+            while self._entries:
+                character_id, (last_used, _) = next(iter(self._entries.items()))
+                if last_used > cutoff:
+                    break
+                del self._entries[character_id]
+                removed += 1
+        return removed
+
+    @contextmanager
+    def lock(self, character_id, timeout=LOCK_TIMEOUT):
+        with self._lock:
+            lock = self._character_locks.get(character_id)
+            if lock is None:
+                lock = self._character_locks[character_id] = threading.Lock()
+        if not lock.acquire(timeout=timeout):
+            raise CharacterBusy(character_id)
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteCombatStore(CombatStore):
+    """Store shared by every worker through a WAL-mode SQLite file"""
+
+    PURGE_EVERY = 500  # puts between opportunistic TTL sweeps
+
+    def __init__(self, path='combat_sessions.db', ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._puts = 0
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS combat_sessions (
+                character_id INTEGER PRIMARY KEY,
+                state BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_combat_sessions_updated ON combat_sessions(updated_at)')
+        # Leases held by requests working on a character (see lock())
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS character_locks (
+                character_id INTEGER PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, character_id):
+        row = self._connection().execute(
+            'SELECT state FROM combat_sessions WHERE character_id = ? AND updated_at > ?',
+            (character_id, time.time() - self.ttl)
+        ).fetchone()
+        return CombatState.decode(row[0]) if row else None
+
+    def put(self, character_id, state, expected=None):
+        if expected is None:
+            cursor = self._connection().execute(
+                'INSERT OR REPLACE INTO combat_sessions (character_id, state, updated_at) VALUES (?, ?, ?)',
+                (character_id, state.encode(), time.time())
+            )
+        else:
+            # Decoding and re-encoding a record gives back the same bytes
+            cursor = self._connection().execute(
+                'UPDATE combat_sessions SET state = ?, updated_at = ? WHERE character_id = ? AND state = ?',
+                (state.encode(), time.time(), character_id, expected.encode())
+            )
+        self._puts += 1
+        if self._puts % self.PURGE_EVERY == 0:
+            self.purge_expired()
+        return cursor.rowcount == 1
+
+    def delete(self, character_id, expected=None):
+        if expected is None:
+            cursor = self._connection().execute(
+                'DELETE FROM combat_sessions WHERE character_id = ?', (character_id,)
+            )
+        else:
+            cursor = self._connection().execute(
+                'DELETE FROM combat_sessions WHERE character_id = ? AND state = ?',
+                (character_id, expected.encode())
+            )
+        return cursor.rowcount == 1
+
+    def purge_expired(self):
+        cursor = self._connection().execute(
+            'DELETE FROM combat_sessions WHERE updated_at <= ?',
+            (time.time() - self.ttl,)
+        )
+        return cursor.rowcount
+
+    @contextmanager
+    def lock(self, character_id, timeout=LOCK_TIMEOUT):
+        conn = self._connection()
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        delay = 0.005
+        while True:
+            now = time.time()
+            # Takes the lease if it is free or has run out
+            cursor = conn.execute('''
+                INSERT INTO character_locks (character_id, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (character_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE character_locks.expires_at < ?
+            ''', (character_id, owner, now + LOCK_LEASE, now))
+            if cursor.rowcount == 1:
+                break
+            if time.monotonic() + delay > deadline:
+                raise CharacterBusy(character_id)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        try:
+            yield
+        finally:
+            conn.execute('DELETE FROM character_locks WHERE character_id = ? AND owner = ?', (character_id, owner))
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM combat_sessions').fetchone()[0]
+
+def create_combat_store(url='memory', ttl=DEFAULT_TTL):
+    """Build a store from a config string: 'memory' or 'sqlite:///path/to/file.db'"""
+    if url == 'memory':
+        return MemoryCombatStore(ttl=ttl)
+    if url.startswith('sqlite:///'):
+        return SQLiteCombatStore(url[len('sqlite:///'):], ttl=ttl)
+    raise ValueError(f"Unknown combat store: {url}")
@@ -0,0 +1,185 @@
+"""
+Exact damage and win-probability model.
+
+An attack's damage depends only on a uniform weapon (or skill) roll, a crit
+draw and fixed profile numbers, so its distribution can be enumerated
+exactly instead of sampled. From the per-attack PMFs, a dynamic program over
+remaining HP gives the distribution of attacks each side needs to land the
+killing blow; chi spending is deterministic (skill while affordable, basic
+attack after), and both sides swing once per turn with a fixed initiative
+probability, so the fight's win/loss/timeout probabilities and turn-count
+distribution follow in closed form. Results match simulation.py's Monte
+Carlo estimates without drawing a single random number.
+
+PMFs and matchups are cached by their (hashable) inputs: CombatProfiles,
+skill numbers, starting HP/chi and the turn cap.
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+
+from combat import select_hotbar_skill
+from combat_profile import character_profile, enemy_profile
+
+DEFAULT_MAX_TURNS = 200
+
+@dataclass(frozen=True, slots=True)
+class SkillKey:
+    """The numbers of a Skill that affect damage"""
+    chi_cost: int
+    damage_min: int
+    damage_max: int
+    chi_kung: bool
+
+    @classmethod
+    def from_skill(cls, skill):
+        if skill is None:
+            return None
+        return cls(skill.chi_cost or 0, skill.base_damage_min or 0, skill.base_damage_max or 0,
+                   skill.skill_type == 'chi_kung')
+
+@dataclass(frozen=True)
+class DamagePMF:
+    """Exact distribution of one attack's damage"""
+    damage: np.ndarray  # distinct damage values, ascending
+    prob: np.ndarray  # probability of each value
+
+    @property
+    def mean(self):
+        return float(self.damage @ self.prob)
+
+    def to_dict(self):
+        return {int(d): float(p) for d, p in zip(self.damage, self.prob)}
+
+@dataclass(frozen=True)
+class Matchup:
+    """Exact outcome distribution of a fight fought with attacks only"""
+    win: float
+    loss: float
+    timeout: float
+    turns: np.ndarray = field(repr=False)  # turns[n] = P(fight ends on turn n)
+    win_turns: np.ndarray = field(repr=False)  # win_turns[n] = P(character wins on turn n)
+
+    @property
+    def expected_turns(self):
+        """Mean turns of fights that end within the turn cap"""
+        return _mean_turns(self.turns)
+
+    @property
+    def expected_turns_to_kill(self):
+        """Mean turns of won fights (simulate_fights' mean_turns_to_kill)"""
+        return _mean_turns(self.win_turns)
+
+    def summary(self):
+        return {
+            'win': self.win,
+            'loss': self.loss,
+            'timeout': self.timeout,
+            'expected_turns': self.expected_turns,
+            'expected_turns_to_kill': self.expected_turns_to_kill
+        }
+
+def _mean_turns(turns):
+    total = turns.sum()
+    return float(np.arange(turns.size) @ turns / total) if total else None
+
+# ============================================
+# SINGLE ATTACKS
+# ============================================
+
+@lru_cache(maxsize=4096)
+def damage_pmf(attacker, defender, skill=None):
+    """DamagePMF of attacker (CombatProfile) hitting defender, with an
+    affordable SkillKey or a basic attack.
+
+    Uses the engine's own float arithmetic, so every value is exactly one
+    Combat.basic_attack can return.
+    """
+    if skill is None:
+        low, high, stat = attacker.damage_min, attacker.damage_max, attacker.body
+    else:
+        low, high = skill.damage_min, skill.damage_max
+        stat = attacker.spirit if skill.chi_kung else attacker.body
+    crit = min(1.0, max(0.0, attacker.crit_chance))
+    share = 1 / (high - low + 1)
+
+    pmf = {}
+    for roll in range(low, high + 1):
+        base_damage = stat * (roll / 10)
+        for damage, p in ((base_damage, 1 - crit), (base_damage * 2, crit)):
+            value = max(1, int(damage + attacker.damage_bonus - defender.defense))
+            pmf[value] = pmf.get(value, 0.0) + p * share
+    values = sorted(v for v, p in pmf.items() if p > 0)
+    return DamagePMF(np.array(values, dtype=np.int64), np.array([pmf[v] for v in values]))
+
+def skill_attacks(chi, skill):
+    """How many opening attacks use the skill before chi runs out"""
+    if skill is None:
+        return 0
+    if skill.chi_cost <= 0:
+        return DEFAULT_MAX_TURNS * 1000
+    return max(0, chi) // skill.chi_cost
+
+def attacks_to_kill(pmfs, hp, max_attacks):
+    """P(the n-th attack is the killing blow) for n = 0..max_attacks.
+
+    pmfs(n) is the DamagePMF of attack n. Tracks the distribution of the
+    target's remaining HP, moving mass that drops to 0 or below into the
+    kill distribution.
+    """
+    hp = max(1, hp)
+    alive = np.zeros(hp + 1)
+    alive[hp] = 1.0  # index = remaining HP
+    killed = np.zeros(max_attacks + 1)
+    for n in range(1, max_attacks + 1):
+        pmf = pmfs(n)
+        after = np.zeros(hp + 1)
+        for damage, p in zip(pmf.damage, pmf.prob):
+            if damage <= hp:
+                after[:hp + 1 - damage] += p * alive[damage:]
+        after[0] = 0.0
+        killed[n] = max(0.0, alive.sum() - after.sum())
+        alive = after
+        if alive.sum() < 1e-15:
+            break
+    return killed
+
+def initiative_chance(flow, enemy_flow):
+    """P(character acts first): flow + d10 >= enemy flow + d10"""
+    rolls = np.arange(1, 11)
+    return float(np.mean((flow + rolls[:, None]) >= (enemy_flow + rolls[None, :])))
+
+# ============================================
+# FIGHTS
+# ============================================
+
+@lru_cache(maxsize=1024)
+def matchup(profile, foe, hp, chi, foe_hp, skill=None, max_turns=DEFAULT_MAX_TURNS):
+    """Exact Matchup of a character (profile, current hp/chi, hotbar SkillKey)
+    attacking every turn against an enemy profile with foe_hp.
+    """
+    skilled = skill_attacks(chi, skill)
+    basic = damage_pmf(profile, foe)
+    special = damage_pmf(profile, foe, skill) if skill is not None else basic
+    player = attacks_to_kill(lambda n: special if n <= skilled else basic, foe_hp, max_turns)
+    enemy_hit = damage_pmf(foe, profile)
+    enemy = attacks_to_kill(lambda n: enemy_hit, hp, max_turns)
+
+    # Both sides swing once per turn; on the turn both would land a killing
+    # blow, whoever has initiative wins
+    first = initiative_chance(profile.flow, foe.flow)
+    player_later = np.clip(1 - np.cumsum(player), 0, 1)  # P(player still needs more than n attacks)
+    enemy_later = np.clip(1 - np.cumsum(enemy), 0, 1)
+    wins = player * (enemy_later + first * enemy)
+    losses = enemy * (player_later + (1 - first) * player)
+    win, loss = float(wins.sum()), float(losses.sum())
+    return Matchup(win=win, loss=loss, timeout=max(0.0, 1 - win - loss), turns=wins + losses, win_turns=wins)
+
+def win_probability(character, enemy, character_skills=None, profile=None, max_turns=DEFAULT_MAX_TURNS):
+    """Exact Matchup of character vs enemy, with simulate_fights' arguments"""
+    profile = profile or character_profile(character)
+    skill = SkillKey.from_skill(select_hotbar_skill(character_skills))
+    return matchup(profile, enemy_profile(enemy), character.current_hp, character.current_chi,
+                   enemy.max_hp, skill, max_turns)
@@ -350,10 +350,12 @@ CREATE TABLE travel_log (
 -- INDEXES FOR PERFORMANCE
 -- ============================================
 
-CREATE INDEX idx_characters_account ON characters(account_id);
+CREATE INDEX idx_characters_account ON characters(account_id, id);  -- keyset pages per account
 CREATE INDEX idx_characters_zone ON characters(current_zone_id);
 CREATE INDEX idx_character_skills_char ON character_skills(character_id);
 CREATE INDEX idx_character_inventory_char ON character_inventory(character_id);
+CREATE UNIQUE INDEX idx_character_inventory_bag ON character_inventory(character_id, bag_slot);  -- one stack per slot
 CREATE INDEX idx_combat_log_char ON combat_log(character_id);
+CREATE INDEX idx_combat_log_end ON combat_log(combat_end);  -- win rate rollups
 CREATE INDEX idx_zone_enemies_zone ON zone_enemies(zone_id);
 CREATE INDEX idx_loot_tables_enemy ON loot_tables(enemy_template_id);
@@ -0,0 +1,101 @@
+"""
+Database engine profiles.
+
+A profile bundles the engine options and per-connection settings for one
+deployment style, applied when the app starts:
+
+    development - SQLite with library defaults (what the game always used)
+    production  - SQLite in WAL mode: readers never block the writer,
+                  synchronous=NORMAL, memory-mapped reads, a busy timeout
+                  instead of instant "database is locked" errors, a sized
+                  connection pool and a larger prepared statement cache
+
+In-memory SQLite (sqlite:// or :memory:) runs on SQLAlchemy's single
+connection StaticPool, so pool sizing is left out for it.
+
+Pointing DATABASE_URL at postgresql://... switches to the PostgreSQL schema
+in database/schema.sql (load it with `python init_db.py --postgres URL`);
+the profile's pool settings still apply and SQLite pragmas are skipped.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+PROFILES = {
+    'development': {},
+    'production': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,  # ms
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,  # KiB
+            'temp_store': 'MEMORY',
+        },
+        'pool_size': 10,
+        'max_overflow': 20,
+        'statement_cache': 512,
+    },
+}
+
+DEFAULT_PROFILE = 'production'
+
+def is_sqlite(url):
+    return url.startswith('sqlite')
+
+def is_memory_sqlite(url):
+    parsed = make_url(url)
+    return (parsed.get_backend_name() == 'sqlite'
+            and (parsed.database in (None, '', ':memory:') or parsed.query.get('mode') == 'memory'))
+
+def engine_options(url, profile):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URL under a profile"""
+    options = {}
+    if 'pool_size' in profile and not is_memory_sqlite(url):
+        options['pool_size'] = profile['pool_size']
+        options['max_overflow'] = profile['max_overflow']
+    if 'statement_cache' in profile:
+        # Compiled SQL for the hot ORM queries is reused across requests
+        options['query_cache_size'] = profile['statement_cache'] * 2
+    if is_sqlite(url):
+        if not profile:
+            return options  # library defaults
+        options['connect_args'] = {
+            # sqlite3 keeps this many prepared statements per connection
+            'cached_statements': profile['statement_cache'],
+            'timeout': profile['pragmas'].get('busy_timeout', 5000) / 1000,
+            # Pooled connections move between request threads
+            'check_same_thread': False,
+        }
+    else:
+        options['pool_pre_ping'] = True
+        if url.startswith('postgresql+psycopg:'):
+            # psycopg 3 prepares statements server-side once they repeat
+            options['connect_args'] = {'prepare_threshold': 2}
+    return options
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+def init_database_engine(app, db):
+    """Configure the engine from DATABASE_PROFILE, then bind db to the app"""
+    name = app.config.get('DATABASE_PROFILE', DEFAULT_PROFILE)
+    if name not in PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE {name!r}; expected one of {', '.join(PROFILES)}")
+    profile = PROFILES[name]
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+
+    options = engine_options(url, profile)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    db.init_app(app)
+
+    if is_sqlite(url) and profile.get('pragmas'):
+        with app.app_context():
+            # Runs on every new pooled connection before it is used
+            @event.listens_for(db.engine, 'connect')
+            def set_sqlite_pragmas(dbapi_connection, connection_record):
+                apply_pragmas(dbapi_connection, profile['pragmas'])
@@ -0,0 +1,198 @@
+"""
+Group encounters: N characters against M enemies.
+
+Every combatant's HP, Chi, stats and skill are held in flat NumPy arrays
+indexed by combatant, players first. A round draws initiative, targets,
+weapon rolls and crits for all living combatants at once and computes
+every attack's damage with the same formula as combat.Combat, so the
+Python-level work per round does not grow with party size.
+
+Attacks land in initiative order (players win ties, as in Combat). A
+combatant that falls before its turn doesn't swing, and swings at an
+already-fallen target are lost; resolve_round() finds those deaths by
+fixed-point iteration over the round's cumulative damage, one confirmed
+death per pass.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from combat import select_hotbar_skill
+from combat_profile import character_profile, enemy_profile
+from rng import numpy_stream
+from simulation import attack_damage
+
+PLAYERS = 0
+ENEMIES = 1
+DEFAULT_MAX_ROUNDS = 200
+
+# Attacks of one round in initiative order; damage is 0 for attacks that didn't land
+RoundOutcome = namedtuple('RoundOutcome', 'round attackers targets damage crits hp')
+
+class Encounter:
+    """One group fight resolved a round at a time"""
+
+    def __init__(self, characters, enemies, character_skills=None, seed=None, stream=0, profiles=None):
+        """characters/enemies are Character and Enemy rows (or look-alikes);
+        character_skills (and optionally prebuilt CombatProfiles) are one per
+        character, in the same order."""
+        if not characters or not enemies:
+            raise ValueError("An encounter needs at least one character and one enemy")
+        self.rng = seed if isinstance(seed, np.random.Generator) else numpy_stream(seed, stream)
+        self.names = [c.name for c in characters] + [e.name for e in enemies]
+        self.n_players = n = len(characters)
+        self.size = size = n + len(enemies)
+        skills = [select_hotbar_skill(s) for s in (character_skills or [None] * n)]
+        units = list(profiles or map(character_profile, characters)) + [enemy_profile(e) for e in enemies]
+
+        self.side = np.array([PLAYERS] * n + [ENEMIES] * len(enemies), dtype=np.int8)
+        self.hp = np.array([c.current_hp for c in characters] + [e.max_hp for e in enemies], dtype=np.int64)
+        self.max_hp = np.array([c.max_hp for c in characters] + [e.max_hp for e in enemies], dtype=np.int64)
+        self.chi = np.array([c.current_chi for c in characters] + [0] * len(enemies), dtype=np.int64)
+        self.speed = np.array([u.flow for u in units], dtype=np.int64)
+        self.defense = np.array([u.defense for u in units], dtype=np.int64)
+        # Basic attacks scale with Body (players) or half attack power (enemies)
+        self.stat = np.array([u.body for u in units], dtype=np.int64)
+        self.crit_chance = np.array([u.crit_chance for u in units])
+        self.damage_bonus = np.array([u.damage_bonus for u in units], dtype=np.int64)
+        self.basic_min = np.array([u.damage_min for u in units], dtype=np.int64)
+        self.basic_max = np.array([u.damage_max for u in units], dtype=np.int64)
+
+        # Hotbar skill per character; enemies never have one
+        has_skill = [s is not None for s in skills] + [False] * len(enemies)
+        self.has_skill = np.array(has_skill)
+        self.skill_cost = np.array([(s.chi_cost or 0) if s else 0 for s in skills] + [0] * len(enemies),
+                                   dtype=np.int64)
+        self.skill_min = np.array([(s.base_damage_min or 0) if s else 8 for s in skills] + [8] * len(enemies),
+                                  dtype=np.int64)
+        self.skill_max = np.array([(s.base_damage_max or 0) if s else 12 for s in skills] + [12] * len(enemies),
+                                  dtype=np.int64)
+        self.skill_stat = np.array(
+            [(u.spirit if s.skill_type == 'chi_kung' else u.body) if s else u.body
+             for u, s in zip(units, skills)] + list(self.stat[n:]),
+            dtype=np.int64
+        )
+
+        self.wounds = np.zeros(size, dtype=np.int64)
+        self.damage_dealt = np.zeros(size, dtype=np.int64)
+        self.round_number = 1
+
+    @property
+    def alive(self):
+        return self.hp > 0
+
+    @property
+    def victory(self):
+        return not self.alive[self.n_players:].any()
+
+    @property
+    def defeat(self):
+        return not self.alive[:self.n_players].any()
+
+    @property
+    def is_over(self):
+        return self.victory or self.defeat
+
+    # ============================================
+    # ROUNDS
+    # ============================================
+
+    def _pick_targets(self, attackers):
+        """A random living opponent for each attacker"""
+        rng = self.rng
+        alive = self.alive
+        targets = np.empty(attackers.size, dtype=np.int64)
+        for side in (PLAYERS, ENEMIES):
+            mine = self.side[attackers] == side
+            opponents = np.flatnonzero(alive & (self.side != side))
+            targets[mine] = opponents[rng.integers(0, opponents.size, int(mine.sum()))]
+        return targets
+
+    def play_round(self):
+        """Resolve one round for every living combatant and return its RoundOutcome"""
+        rng = self.rng
+        living = np.flatnonzero(self.alive)
+        k = living.size
+
+        # Initiative: speed + d10, players first on ties
+        initiative = self.speed[living] + rng.integers(1, 11, k)
+        attackers = living[np.lexsort((living, self.side[living], -initiative))]
+        targets = self._pick_targets(attackers)
+
+        # Skill when affordable, basic attack otherwise
+        use_skill = self.has_skill[attackers] & (self.chi[attackers] >= self.skill_cost[attackers])
+        skill_roll = rng.integers(self.skill_min[attackers], self.skill_max[attackers] + 1)
+        basic_roll = rng.integers(self.basic_min[attackers], self.basic_max[attackers] + 1)
+        weapon = np.where(use_skill, skill_roll, basic_roll)
+        stat = np.where(use_skill, self.skill_stat[attackers], self.stat[attackers])
+        damage, crits = attack_damage(rng, stat, weapon, self.crit_chance[attackers],
+                                      self.defense[targets], return_crits=True,
+                                      damage_bonus=self.damage_bonus[attackers])
+
+        landed = resolve_round(attackers, targets, damage, self.hp)
+        damage = np.where(landed, damage, 0)
+
+        taken = np.bincount(targets, weights=damage, minlength=self.size).astype(np.int64)
+        self.hp -= taken
+        self.wounds += taken
+        self.damage_dealt += np.bincount(attackers, weights=damage, minlength=self.size).astype(np.int64)
+        np.subtract.at(self.chi, attackers[landed & use_skill], self.skill_cost[attackers[landed & use_skill]])
+
+        outcome = RoundOutcome(self.round_number, attackers, targets, damage, crits & landed, self.hp.copy())
+        self.round_number += 1
+        return outcome
+
+    def run(self, max_rounds=DEFAULT_MAX_ROUNDS):
+        """Play rounds until one side falls or max_rounds; returns the outcomes"""
+        outcomes = []
+        while not self.is_over and len(outcomes) < max_rounds:
+            outcomes.append(self.play_round())
+        return outcomes
+
+    def get_state(self):
+        """JSON-friendly snapshot of every combatant"""
+        return {
+            'round': self.round_number,
+            'combatants': [{
+                'name': self.names[i],
+                'side': 'players' if self.side[i] == PLAYERS else 'enemies',
+                'hp': int(self.hp[i]),
+                'max_hp': int(self.max_hp[i]),
+                'chi': int(self.chi[i]) if self.side[i] == PLAYERS else None,
+                'damage_dealt': int(self.damage_dealt[i]),
+                'alive': bool(self.hp[i] > 0)
+            } for i in range(self.size)],
+            'victory': self.victory,
+            'defeat': self.defeat
+        }
+
+def resolve_round(attackers, targets, damage, hp):
+    """Which attacks of a round land, given attacks sorted in initiative order.
+
+    An attack lands unless its attacker fell earlier in the round or its
+    target already fell. Each pass computes every target's running damage
+    from the attacks currently landing, confirms the earliest killing blow,
+    and repeats until no new death appears, so the loop runs once per
+    death plus once.
+    """
+    n = attackers.size
+    position = np.arange(n)
+    falls_at = np.full(hp.size, n)  # position of each combatant's killing blow (n = survives)
+
+    # Attacks grouped by target, in initiative order within each group
+    by_target = np.argsort(targets, kind='stable')
+    grouped_targets = targets[by_target]
+    starts = np.flatnonzero(np.r_[True, grouped_targets[1:] != grouped_targets[:-1]])
+    group_sizes = np.diff(np.r_[starts, n])
+
+    while True:
+        landed = (falls_at[attackers] > position) & (falls_at[targets] >= position)
+        dealt = np.where(landed, damage, 0)[by_target]
+        running = np.cumsum(dealt)
+        running -= np.repeat(running[starts] - dealt[starts], group_sizes)
+        lethal = landed[by_target] & (hp[grouped_targets] - running <= 0) & (falls_at[grouped_targets] == n)
+        if not lethal.any():
+            return landed
+        first = by_target[lethal].min()
+        falls_at[targets[first]] = first
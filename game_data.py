@@ -0,0 +1,233 @@
+"""
+In-process cache of static game content.
+
+Clans, roles, skills, zones, enemy templates and loot tables only change when seed data
+does, so they are read once into plain frozen records and the JSON bodies of
+the endpoints that serve them are pre-encoded with ETags. The cache is
+read-through: it loads on first use and reloads whenever the configured
+content version (GAME_DATA_VERSION) changes, so bumping the version after a
+seed_data.sql change is all it takes to pick up new content.
+"""
+
+import threading
+from dataclasses import dataclass
+
+from flask import current_app
+
+from models import db, Skill, Zone, EnemyTemplate, ZoneEnemy, LootTable, ItemTemplate
+from loot import LootTables
+from queries import load_clans_with_roles
+from serializers import encode_payload
+from spawn import SpawnTables
+from zone_graph import ZoneGraph
+
+# Bump (or set GAME_DATA_VERSION in the app config) whenever seed data changes
+CONTENT_VERSION = '1'
+
+@dataclass(frozen=True, slots=True)
+class RoleData:
+    id: int
+    clan_id: int
+    name: str
+    archetype: str
+    primary_weapon: str
+    description: str
+    body_bonus: int
+    spirit_bonus: int
+    flow_bonus: int
+
+@dataclass(frozen=True, slots=True)
+class ClanData:
+    id: int
+    name: str
+    faction: str
+    description: str
+    starting_zone_id: int
+    roles: tuple
+
+@dataclass(frozen=True, slots=True)
+class SkillData:
+    id: int
+    name: str
+    skill_type: str
+    clan_id: int
+    role_id: int
+    base_damage_min: int
+    base_damage_max: int
+    chi_cost: int
+    cooldown_ms: int
+    is_active: bool
+    description: str
+    unlock_level: int
+
+@dataclass(frozen=True, slots=True)
+class ZoneData:
+    id: int
+    name: str
+    zone_type: str
+    recommended_level_min: int
+    recommended_level_max: int
+    description: str
+    north_zone_id: int
+    south_zone_id: int
+    east_zone_id: int
+    west_zone_id: int
+    is_safe_zone: bool
+    pvp_enabled: bool
+
+@dataclass(frozen=True, slots=True)
+class EnemyTemplateData:
+    id: int
+    name: str
+    enemy_type: str
+    level: int
+    hp: int
+    chi: int
+    damage_min: int
+    damage_max: int
+    defense: int
+    dodge: int
+    xp_reward: int
+    gold_min: int
+    gold_max: int
+    good_karma_chance: float
+    can_wound: bool
+    description: str
+
+@dataclass(frozen=True, slots=True)
+class ZoneEnemyData:
+    zone_id: int
+    enemy_template_id: int
+    spawn_weight: int
+    is_boss: bool
+
+@dataclass(frozen=True, slots=True)
+class LootDropData:
+    enemy_template_id: int
+    item_template_id: int
+    item_name: str
+    stack_size: int
+    drop_chance: float
+    quantity_min: int
+    quantity_max: int
+
+def _record(cls, row, **extra):
+    """Copy the record's fields off an ORM row"""
+    values = {name: getattr(row, name) for name in cls.__dataclass_fields__ if name not in extra}
+    return cls(**values, **extra)
+
+class GameData:
+    """One consistent load of all static tables"""
+
+    def __init__(self, version):
+        self.version = version
+        self.clans = {}
+        self.roles = {}
+        self.skills = {}
+        self.zones = {}
+        self.enemy_templates = {}
+        self.zone_enemies = {}  # zone_id -> tuple of ZoneEnemyData
+        self.loot = ()  # LootDropData
+        self.spawn_tables = None
+        self.zone_graph = None
+        self.loot_tables = None
+        self.clans_payload = None
+        self.zone_payloads = {}
+
+    def load(self):
+        for clan in load_clans_with_roles():
+            roles = tuple(_record(RoleData, r) for r in sorted(clan.roles, key=lambda r: r.id))
+            self.roles.update((role.id, role) for role in roles)
+            self.clans[clan.id] = _record(ClanData, clan, roles=roles)
+
+        for row in Skill.query.order_by(Skill.id):
+            self.skills[row.id] = _record(SkillData, row)
+
+        for row in Zone.query.order_by(Zone.id):
+            self.zones[row.id] = _record(ZoneData, row)
+
+        for row in EnemyTemplate.query.order_by(EnemyTemplate.id):
+            self.enemy_templates[row.id] = _record(EnemyTemplateData, row)
+
+        zone_enemies = {}
+        for row in ZoneEnemy.query.order_by(ZoneEnemy.id):
+            zone_enemies.setdefault(row.zone_id, []).append(_record(ZoneEnemyData, row))
+        self.zone_enemies = {zone_id: tuple(rows) for zone_id, rows in zone_enemies.items()}
+
+        loot = db.session.query(
+            LootTable.enemy_template_id, LootTable.item_template_id, LootTable.drop_chance,
+            LootTable.quantity_min, LootTable.quantity_max,
+            ItemTemplate.name.label('item_name'), ItemTemplate.stack_size
+        ).join(ItemTemplate, LootTable.item_template_id == ItemTemplate.id).order_by(LootTable.id)
+        self.loot = tuple(_record(LootDropData, row) for row in loot)
+
+        self.spawn_tables = SpawnTables(self)
+        self.zone_graph = ZoneGraph(self)
+        self.loot_tables = LootTables(self)
+        self._build_payloads()
+        return self
+
+    def _build_payloads(self):
+        self.clans_payload = encode_payload(self.version, [{
+            'id': clan.id,
+            'name': clan.name,
+            'faction': clan.faction,
+            'description': clan.description,
+            'roles': [{
+                'id': r.id,
+                'name': r.name,
+                'archetype': r.archetype,
+                'primary_weapon': r.primary_weapon,
+                'description': r.description
+            } for r in clan.roles]
+        } for clan in self.clans.values()])
+
+        self.zone_payloads = {zone.id: encode_payload(self.version, {
+            'id': zone.id,
+            'name': zone.name,
+            'description': zone.description,
+            'zone_type': zone.zone_type,
+            'recommended_level_min': zone.recommended_level_min,
+            'recommended_level_max': zone.recommended_level_max,
+            'is_safe_zone': zone.is_safe_zone
+        }) for zone in self.zones.values()}
+
+    def starting_skills(self, clan_id, role_id):
+        """Skills a new character of this clan/role learns at level 1"""
+        return [s for s in self.skills.values()
+                if s.clan_id == clan_id and s.role_id == role_id and s.unlock_level == 1]
+
+    def spawnable_enemies(self, zone_id):
+        """Non-boss zone enemies for random spawns"""
+        return [ze for ze in self.zone_enemies.get(zone_id, ()) if not ze.is_boss]
+
+_cache = None
+_lock = threading.Lock()
+
+def configured_version():
+    return str(current_app.config.get('GAME_DATA_VERSION', CONTENT_VERSION))
+
+def cached_game_data():
+    """Current GameData if it is already loaded, else None; never reads the database"""
+    cache = _cache
+    if cache is not None and cache.version == configured_version():
+        return cache
+    return None
+
+def get_game_data():
+    """Current GameData, loading it on first use or after a version bump"""
+    global _cache
+    cache = cached_game_data()
+    if cache is not None:
+        return cache
+    version = configured_version()
+    with _lock:
+        if _cache is None or _cache.version != version:
+            _cache = GameData(version).load()
+        return _cache
+
+def invalidate():
+    """Force the next get_game_data() to reload from the database"""
+    global _cache
+    with _lock:
+        _cache = None
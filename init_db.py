@@ -1,94 +1,292 @@
 """
 Database initialization script for Five Winds.
 Loads seed data from SQL files into the SQLite database.
+
+The PostgreSQL schema and seed files are parsed once per process: INSERT
+statements become (table, columns, rows) batches loaded with executemany
+inside a single transaction, with bulk-load PRAGMAs on and indexes created
+after the data. A built database can be snapshotted and restored with
+SQLite's backup API, which is the fastest way to get a fresh copy for tests
+or deploys:
+
+    python init_db.py --snapshot database/dragons.snapshot.db
+    python init_db.py --restore database/dragons.snapshot.db
 """
 
+import re
 import sqlite3
+import time
+from functools import lru_cache
 from pathlib import Path
 
-def init_database():
+DATABASE_DIR = Path(__file__).resolve().parent / 'database'
+SCHEMA_PATH = DATABASE_DIR / 'schema.sql'
+SEED_PATH = DATABASE_DIR / 'seed_data.sql'
+
+# PostgreSQL -> SQLite type and default conversions for schema.sql
+SQLITE_REPLACEMENTS = (
+    ('SERIAL PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    ('TEXT[]', 'TEXT'),
+    ('JSON', 'TEXT'),
+    ('TIMESTAMP', 'DATETIME'),
+    # SQLite only accepts an expression default in parentheses
+    ('NOW()', "(datetime('now'))"),
+    ('DECIMAL(3,2)', 'REAL'),
+    ('DECIMAL(5,4)', 'REAL'),
+)
+
+# Speed over durability while the file is being built; a failed build is simply rerun
+BULK_PRAGMAS = (
+    'PRAGMA journal_mode=MEMORY',
+    'PRAGMA synchronous=OFF',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA foreign_keys=OFF',
+)
+
+# ============================================
+# PARSING
+# ============================================
+
+# String literal, comment, statement terminator, or a run of anything else
+_STATEMENT_TOKEN = re.compile(r"'(?:[^']|'')*'|--[^\n]*|;|[^';-]+|-")
+_INSERT = re.compile(r'INSERT\s+INTO\s+(\w+)\s*\(([^)]*)\)\s*VALUES\s*(.*)', re.IGNORECASE | re.DOTALL)
+_VALUE_TOKEN = re.compile(
+    r"\s*(?:'((?:[^']|'')*)'|(NULL|TRUE|FALSE|NOW\(\))|(-?\d+\.\d*)|(-?\d+)|([(),]))",
+    re.IGNORECASE
+)
+
+def split_statements(sql):
+    """Statements in a SQL script, without comments (string literals may contain ';' or '--')"""
+    statements, current = [], []
+    for token in _STATEMENT_TOKEN.findall(sql):
+        if token == ';':
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        elif not token.startswith('--'):
+            current.append(token)
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+def parse_values(text, now):
+    """Rows from a VALUES list of literals, or None if it holds anything else"""
+    rows, row, depth, pos = [], None, 0, 0
+    while pos < len(text):
+        match = _VALUE_TOKEN.match(text, pos)
+        if match is None:
+            return None if text[pos:].strip() else rows
+        pos = match.end()
+        string, keyword, real, integer, punct = match.groups()
+        if punct == '(':
+            if depth:
+                return None  # nested expression
+            row, depth = [], 1
+        elif punct == ')':
+            if not depth:
+                return None
+            rows.append(tuple(row))
+            depth = 0
+        elif punct == ',':
+            continue
+        elif not depth:
+            return None
+        elif string is not None:
+            row.append(string.replace("''", "'"))
+        elif keyword is not None:
+            keyword = keyword.upper()
+            row.append({'NULL': None, 'TRUE': 1, 'FALSE': 0}.get(keyword, now))
+        elif real is not None:
+            row.append(float(real))
+        else:
+            row.append(int(integer))
+    return rows if not depth else None
+
+def parse_seed(sql):
+    """Seed script as ('insert', table, columns, rows) batches and ('sql', statement) steps"""
+    now = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+    steps = []
+    for statement in split_statements(sql):
+        match = _INSERT.match(statement)
+        rows = parse_values(match.group(3), now) if match else None
+        if rows:
+            columns = tuple(c.strip() for c in match.group(2).split(','))
+            steps.append(('insert', match.group(1), columns, rows))
+        else:
+            steps.append(('sql', statement.replace('NOW()', "datetime('now')")))
+    return steps
+
+def parse_schema(sql):
+    """SQLite table statements and the index statements to run after loading"""
+    for old, new in SQLITE_REPLACEMENTS:
+        sql = sql.replace(old, new)
+    tables, indexes = [], []
+    for statement in split_statements(sql):
+        is_index = re.match(r'CREATE\s+(UNIQUE\s+)?INDEX', statement, re.IGNORECASE)
+        (indexes if is_index else tables).append(statement)
+    return tables, indexes
+
+@lru_cache(maxsize=4)
+def _load_scripts(schema_path, seed_path, mtimes):
+    schema = parse_schema(Path(schema_path).read_text(encoding='utf-8'))
+    seed = parse_seed(Path(seed_path).read_text(encoding='utf-8'))
+    return schema, seed
+
+def load_scripts(schema_path=SCHEMA_PATH, seed_path=SEED_PATH):
+    """Parsed schema and seed, cached until either file changes"""
+    mtimes = (Path(schema_path).stat().st_mtime_ns, Path(seed_path).stat().st_mtime_ns)
+    return _load_scripts(str(schema_path), str(seed_path), mtimes)
+
+# ============================================
+# BUILDING
+# ============================================
+
+def _execute(cursor, statement):
+    try:
+        cursor.execute(statement)
+    except sqlite3.Error as e:
+        print(f"Warning: {e}")
+        print(f"Statement: {statement[:100]}...")
+
+def build_database(conn, schema_path=SCHEMA_PATH, seed_path=SEED_PATH):
+    """Create tables, load seed rows and build indexes in one transaction"""
+    (tables, indexes), seed = load_scripts(schema_path, seed_path)
+    conn.isolation_level = None  # manage the transaction explicitly
+    cursor = conn.cursor()
+    for pragma in BULK_PRAGMAS:
+        cursor.execute(pragma)
+
+    cursor.execute('BEGIN')
+    try:
+        for statement in tables:
+            _execute(cursor, statement)
+
+        for step in seed:
+            if step[0] == 'insert':
+                _, table, columns, rows = step
+                placeholders = ', '.join('?' * len(columns))
+                try:
+                    cursor.executemany(
+                        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+                    )
+                except sqlite3.Error as e:
+                    print(f"Warning: {e}")
+                    print(f"Insert into {table}: {len(rows)} rows")
+            else:
+                _execute(cursor, step[1])
+
+        # Indexes are cheaper to build once over loaded tables
+        for statement in indexes:
+            _execute(cursor, statement)
+        cursor.execute('COMMIT')
+    except BaseException:
+        cursor.execute('ROLLBACK')
+        raise
+
+    cursor.execute('PRAGMA synchronous=FULL')
+    cursor.execute('PRAGMA foreign_keys=ON')
+    conn.isolation_level = ''
+
+def table_counts(conn):
+    tables = ('clans', 'roles', 'skills', 'zones', 'enemy_templates')
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables}
+
+def init_database(db_path='dragons.db'):
     """Initialize database with schema and seed data."""
-    
-    db_path = Path('dragons.db')
-    schema_path = Path('database/schema.sql')
-    seed_path = Path('database/seed_data.sql')
-    
+
+    db_path = Path(db_path)
+
     # Delete existing database to start fresh
     if db_path.exists():
         print(f"Removing existing database: {db_path}")
         db_path.unlink()
-    
+
     print("Creating new database...")
+    start = time.perf_counter()
     conn = sqlite3.connect(str(db_path))
-    cursor = conn.cursor()
-    
-    # Read and execute schema
-    # Note: PostgreSQL syntax needs some adjustments for SQLite
-    print("Loading schema...")
-    with open(schema_path, 'r') as f:
-        schema_sql = f.read()
-        
-        # Convert PostgreSQL to SQLite syntax
-        schema_sql = schema_sql.replace('SERIAL PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT')
-        schema_sql = schema_sql.replace('TEXT[]', 'TEXT')
-        schema_sql = schema_sql.replace('JSON', 'TEXT')
-        schema_sql = schema_sql.replace('TIMESTAMP', 'DATETIME')
-        schema_sql = schema_sql.replace('NOW()', "datetime('now')")
-        schema_sql = schema_sql.replace('DECIMAL(3,2)', 'REAL')
-        schema_sql = schema_sql.replace('DECIMAL(5,4)', 'REAL')
-        
-        # Split into individual statements and execute
-        statements = [s.strip() for s in schema_sql.split(';') if s.strip()]
-        for statement in statements:
-            try:
-                cursor.execute(statement)
-            except sqlite3.Error as e:
-                print(f"Warning: {e}")
-                print(f"Statement: {statement[:100]}...")
-    
-    conn.commit()
-    print("Schema loaded successfully.")
-    
-    # Read and execute seed data
-    print("Loading seed data...")
-    with open(seed_path, 'r', encoding='utf-8') as f:
-        seed_sql = f.read()
-        
-        # Convert PostgreSQL to SQLite syntax
-        seed_sql = seed_sql.replace("NOW()", "datetime('now')")
-        
-        # Split into individual statements
-        statements = [s.strip() for s in seed_sql.split(';') if s.strip()]
-        for statement in statements:
-            try:
-                cursor.execute(statement)
-            except sqlite3.Error as e:
-                print(f"Warning: {e}")
-                print(f"Statement: {statement[:100]}...")
-    
-    conn.commit()
-    print("Seed data loaded successfully.")
-    
-    # Verify data
-    cursor.execute("SELECT COUNT(*) FROM clans")
-    clan_count = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM roles")
-    role_count = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM skills")
-    skill_count = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM zones")
-    zone_count = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM enemy_templates")
-    enemy_count = cursor.fetchone()[0]
-    
-    print(f"\n✓ Database initialized successfully!")
-    print(f"  - {clan_count} clans")
-    print(f"  - {role_count} roles")
-    print(f"  - {skill_count} skills")
-    print(f"  - {zone_count} zones")
-    print(f"  - {enemy_count} enemies")
-    
+    build_database(conn)
+    counts = table_counts(conn)
     conn.close()
 
+    print(f"\n✓ Database initialized successfully in {(time.perf_counter() - start) * 1000:.1f} ms!")
+    print(f"  - {counts['clans']} clans")
+    print(f"  - {counts['roles']} roles")
+    print(f"  - {counts['skills']} skills")
+    print(f"  - {counts['zones']} zones")
+    print(f"  - {counts['enemy_templates']} enemies")
+
+# ============================================
+# SNAPSHOTS
+# ============================================
+
+def _copy_database(source_path, target_path):
+    """Page-level copy through SQLite's online backup API"""
+    source = sqlite3.connect(str(source_path))
+    target = sqlite3.connect(str(target_path))
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def snapshot_database(snapshot_path, db_path=None):
+    """Save a prebuilt database; builds a fresh seeded one in memory when db_path is None"""
+    snapshot_path = Path(snapshot_path)
+    if snapshot_path.exists():
+        snapshot_path.unlink()
+    if db_path is not None:
+        _copy_database(db_path, snapshot_path)
+    else:
+        conn = sqlite3.connect(':memory:')
+        build_database(conn)
+        target = sqlite3.connect(str(snapshot_path))
+        conn.backup(target)
+        target.close()
+        conn.close()
+    print(f"✓ Snapshot written to {snapshot_path}")
+
+def restore_database(snapshot_path, db_path='dragons.db'):
+    """Replace db_path with a copy of a snapshot"""
+    if not Path(snapshot_path).exists():
+        raise FileNotFoundError(f"No database snapshot at {snapshot_path}")
+    _copy_database(snapshot_path, db_path)
+    print(f"✓ Restored {db_path} from {snapshot_path}")
+
+def init_postgres_database(url):
+    """Load schema.sql and seed_data.sql unmodified into PostgreSQL (drops the public schema first)."""
+    from sqlalchemy import create_engine
+
+    print("Recreating PostgreSQL schema...")
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.exec_driver_sql('DROP SCHEMA IF EXISTS public CASCADE')
+        conn.exec_driver_sql('CREATE SCHEMA public')
+        for path in (SCHEMA_PATH, SEED_PATH):
+            print(f"Loading {path.name}...")
+            conn.exec_driver_sql(path.read_text(encoding='utf-8'))
+        clan_count = conn.exec_driver_sql('SELECT COUNT(*) FROM clans').scalar()
+    engine.dispose()
+
+    print(f"\n✓ PostgreSQL database initialized with {clan_count} clans")
+
 if __name__ == '__main__':
-    init_database()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Create and seed the Five Winds database.')
+    parser.add_argument('--db', default='dragons.db', help='SQLite database file (default: dragons.db)')
+    parser.add_argument('--postgres', metavar='URL', help='load into PostgreSQL at this SQLAlchemy URL instead of SQLite')
+    parser.add_argument('--snapshot', metavar='PATH', help='write a freshly seeded database snapshot to PATH')
+    parser.add_argument('--restore', metavar='PATH', help='copy the snapshot at PATH over --db')
+    args = parser.parse_args()
+
+    if args.postgres:
+        init_postgres_database(args.postgres)
+    elif args.snapshot:
+        snapshot_database(args.snapshot)
+    elif args.restore:
+        restore_database(args.restore, args.db)
+    else:
+        init_database(args.db)
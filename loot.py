@@ -0,0 +1,161 @@
+"""
+Loot drops and inventory stacking.
+
+Each enemy template's loot_tables rows are turned into NumPy arrays
+(drop chance, quantity range) once per game data load. A roll for any
+number of kills then takes two array draws, with no per-item Python loop.
+Drops are rolled from the fight's seed, so they are replayable like the
+fight itself.
+
+add_to_inventory() stacks drops into the character's bag. It fills
+existing stacks up to the item's stack_size, then opens new stacks in
+free bag slots. It writes everything with one INSERT ... ON CONFLICT (id)
+DO UPDATE: topped-up stacks conflict on their id and take the new
+quantity, and new stacks insert. The write joins the session's transaction
+and commits with the rest of the caller's settlement. If another
+transaction takes one of the chosen bag slots in the meantime, the unique
+idx_character_inventory_bag rejects the insert; the write runs in a
+savepoint, so only it is rolled back, and the bag is read again and the
+loot restacked once before the error is raised.
+
+Bags have no capacity limit: new stacks take the lowest free slots,
+however high that goes.
+"""
+
+from datetime import datetime
+from itertools import count
+
+import numpy as np
+from sqlalchemy import literal_column, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, CharacterInventory
+
+# numpy_stream() stream for loot, after the fight's CombatRNG draws
+LOOT_STREAM = 1
+
+class DropTable:
+    """One enemy template's drops as parallel arrays"""
+    __slots__ = ('item_ids', 'chance', 'quantity_min', 'quantity_max')
+
+    def __init__(self, drops):
+        self.item_ids = np.array([d.item_template_id for d in drops], dtype=np.int64)
+        self.chance = np.array([float(d.drop_chance or 0) for d in drops])
+        self.quantity_min = np.array([d.quantity_min or 1 for d in drops], dtype=np.int64)
+        self.quantity_max = np.array([max(d.quantity_min or 1, d.quantity_max or 1) for d in drops],
+                                     dtype=np.int64)
+
+    def roll(self, rng, kills=1):
+        """Total quantity of each item dropped over kills, aligned with item_ids"""
+        shape = (kills, self.item_ids.size)
+        dropped = rng.random(shape) < self.chance
+        quantity = rng.integers(self.quantity_min, self.quantity_max + 1, size=shape)
+        return np.where(dropped, quantity, 0).sum(axis=0)
+
+class LootTables:
+    """Per-enemy drop tables plus item names and stack sizes for a GameData load"""
+
+    def __init__(self, game_data):
+        by_template = {}
+        self.item_names = {}
+        self.stack_sizes = {}
+        for drop in game_data.loot:
+            by_template.setdefault(drop.enemy_template_id, []).append(drop)
+            self.item_names[drop.item_template_id] = drop.item_name
+            self.stack_sizes[drop.item_template_id] = max(1, drop.stack_size or 1)
+        self.tables = {template_id: DropTable(drops) for template_id, drops in by_template.items()}
+
+    def roll(self, enemy_template_id, rng, kills=1):
+        """{item_template_id: quantity} dropped by kills of one enemy template"""
+        table = self.tables.get(enemy_template_id)
+        if table is None or kills < 1:
+            return {}
+        totals = table.roll(rng, kills)
+        return {int(item_id): int(quantity) for item_id, quantity in zip(table.item_ids, totals) if quantity}
+
+    def roll_kills(self, enemy_template_ids, rng):
+        """{item_template_id: quantity} for a batch of kills, one roll per distinct template"""
+        loot = {}
+        template_ids, kills = np.unique(np.asarray(enemy_template_ids, dtype=np.int64), return_counts=True)
+        for template_id, n in zip(template_ids, kills):
+            for item_id, quantity in self.roll(int(template_id), rng, int(n)).items():
+                loot[item_id] = loot.get(item_id, 0) + quantity
+        return loot
+
+    def describe(self, loot):
+        """JSON-friendly list of dropped items"""
+        return [{'item_template_id': item_id, 'name': self.item_names.get(item_id), 'quantity': quantity}
+                for item_id, quantity in loot.items()]
+
+# ============================================
+# INVENTORY
+# ============================================
+
+def stack_rows(character_id, loot, stack_sizes, bag):
+    """Inventory rows to upsert for loot, given the character's bag.
+
+    bag is (id, item_template_id, quantity, bag_slot) for every unequipped
+    row. Stacks with room are filled first, oldest first; the rest goes into
+    new stacks (id None) in the lowest free bag slots (there is no last one).
+    """
+    rows = []
+    used_slots = {slot for _, _, _, slot in bag if slot is not None}
+    free_slots = (slot for slot in count(1) if slot not in used_slots)
+    now = datetime.utcnow()
+
+    for item_id, quantity in loot.items():
+        stack_size = stack_sizes.get(item_id, 1)
+        for inv_id, template_id, held, slot in sorted(bag):
+            if quantity <= 0:
+                break
+            held = held or 0
+            if template_id != item_id or held >= stack_size:
+                continue
+            added = min(stack_size - held, quantity)
+            rows.append({'id': inv_id, 'character_id': character_id, 'item_template_id': item_id,
+                         'quantity': held + added, 'bag_slot': slot})
+            quantity -= added
+        while quantity > 0:
+            added = min(stack_size, quantity)
+            rows.append({'id': None, 'character_id': character_id, 'item_template_id': item_id,
+                         'quantity': added, 'bag_slot': next(free_slots), 'refinement_level': 0,
+                         'acquired_at': now})
+            quantity -= added
+    return rows
+
+def _upsert(dialect, table, rows):
+    """One multi-row INSERT that updates quantity where the id already exists"""
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    # SERIAL ids only apply when the column is left to DEFAULT; SQLite assigns one for NULL
+    new_id = literal_column('DEFAULT') if dialect == 'postgresql' else None
+    columns = ('character_id', 'item_template_id', 'quantity', 'bag_slot', 'refinement_level', 'acquired_at')
+    # Rows that conflict only contribute their quantity
+    values = [dict({column: row.get(column) for column in columns},
+                   id=new_id if row['id'] is None else row['id']) for row in rows]
+    statement = insert(table).values(values)
+    return statement.on_conflict_do_update(index_elements=[table.c.id],
+                                           set_={'quantity': statement.excluded.quantity})
+
+def add_to_inventory(character_id, loot, stack_sizes, attempts=2):
+    """Stack loot into the character's bag in the session's transaction (not committed):
+    one read, one upsert; returns rows written
+    """
+    if not loot:
+        return 0
+    table = CharacterInventory.__table__
+    for attempt in range(attempts):
+        try:
+            with db.session.begin_nested():
+                bag = db.session.execute(
+                    select(table.c.id, table.c.item_template_id, table.c.quantity, table.c.bag_slot)
+                    .where(table.c.character_id == character_id, table.c.equipped_slot.is_(None))
+                ).all()
+                rows = stack_rows(character_id, loot, stack_sizes, bag)
+                if rows:
+                    db.session.execute(_upsert(db.session.get_bind().dialect.name, table, rows))
+            return len(rows)
+        except IntegrityError:
+            # Another transaction took one of the free slots we picked
+            if attempt == attempts - 1:
+                raise
@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
+from serializers import CHARACTER
+
 db = SQLAlchemy()
 
 class Account(db.Model):
@@ -84,13 +86,38 @@ class Character(db.Model):
     inventory = db.relationship('CharacterInventory', backref='character', cascade='all, delete-orphan')
     quests = db.relationship('CharacterQuest', backref='character', cascade='all, delete-orphan')
     epithets = db.relationship('CharacterEpithet', backref='character', cascade='all, delete-orphan')
-    
-    def calculate_derived_stats(self):
-        """Recalculate HP, Chi, Defense based on core stats + gear"""
-        self.max_hp = 100 + (self.body * 10)
-        self.max_chi = 100 + (self.spirit * 10)
-        self.defense = 5 + (self.body // 2)
-        self.dodge = self.flow // 2
+    active_epithet = db.relationship('Epithet', foreign_keys=[active_epithet_id])
+    
+    @classmethod
+    def from_role(cls, name, clan, role, **fields):
+        """New character of a clan and role, with the role's stat bonuses"""
+        char = cls(
+            name=name,
+            clan_id=clan.id,
+            role_id=role.id,
+            faction=clan.faction,
+            body=10 + (role.body_bonus or 0),
+            spirit=10 + (role.spirit_bonus or 0),
+            flow=10 + (role.flow_bonus or 0),
+            current_zone_id=clan.starting_zone_id,
+            **fields
+        )
+        char.calculate_derived_stats()
+        return char
+    
+    def calculate_derived_stats(self, profile=None):
+        """Recalculate HP, Chi, Defense based on core stats + gear.
+
+        Pass the character's CombatProfile to skip re-reading its gear.
+        """
+        from combat_profile import character_profile
+        profile = profile or character_profile(self)
+        self.max_hp = profile.max_hp
+        self.max_chi = profile.max_chi
+        self.defense = profile.defense
+        self.dodge = profile.dodge
+        self.damage_min = profile.damage_min
+        self.damage_max = profile.damage_max
         
         # Initialize current values if not set
         if self.current_hp is None:
@@ -99,27 +126,7 @@ class Character(db.Model):
             self.current_chi = self.max_chi
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'level': self.level,
-            'sub_level': self.sub_level,
-            'tier': self.tier,
-            'body': self.body,
-            'spirit': self.spirit,
-            'flow': self.flow,
-            'hp': self.current_hp,
-            'max_hp': self.max_hp,
-            'chi': self.current_chi,
-            'max_chi': self.max_chi,
-            'defense': self.defense,
-            'xp': self.experience,
-            'gold': self.gold,
-            'good_karma': self.good_karma,
-            'bad_karma': self.bad_karma,
-            'clan_id': self.clan_id,
-            'role_id': self.role_id
-        }
+        return CHARACTER.dump(self)
 
 class Clan(db.Model):
     __tablename__ = 'clans'
@@ -235,8 +242,13 @@ class CharacterInventory(db.Model):
     equipped_slot = db.Column(db.String(20))
     acquired_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # One stack per bag slot (equipped items have none)
+    __table_args__ = (db.Index('idx_character_inventory_bag', 'character_id', 'bag_slot', unique=True),)
+    
     # Relationships
     item = db.relationship('ItemTemplate', foreign_keys=[item_template_id])
+    ornament_1 = db.relationship('ItemTemplate', foreign_keys=[ornament_1_id])
+    ornament_2 = db.relationship('ItemTemplate', foreign_keys=[ornament_2_id])
 
 class Zone(db.Model):
     __tablename__ = 'zones'
@@ -369,6 +381,35 @@ class CharacterQuest(db.Model):
     # Relationships
     quest = db.relationship('Quest')
 
+class CombatLog(db.Model):
+    __tablename__ = 'combat_log'
+    # Same name as in schema.sql; win rate rollups filter on combat_end
+    __table_args__ = (db.Index('idx_combat_log_end', 'combat_end'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    character_id = db.Column(db.Integer, db.ForeignKey('characters.id', ondelete='CASCADE'))
+    enemy_template_id = db.Column(db.Integer, db.ForeignKey('enemy_templates.id'))
+    zone_id = db.Column(db.Integer, db.ForeignKey('zones.id'))
+    
+    result = db.Column(db.String(20))  # 'victory', 'defeat', 'fled'
+    xp_gained = db.Column(db.Integer)
+    gold_gained = db.Column(db.Integer)
+    loot_gained = db.Column(db.Text)  # JSON stored as text
+    
+    combat_start = db.Column(db.DateTime, default=datetime.utcnow)
+    combat_end = db.Column(db.DateTime)
+
+class TravelLog(db.Model):
+    __tablename__ = 'travel_log'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    character_id = db.Column(db.Integer, db.ForeignKey('characters.id', ondelete='CASCADE'))
+    from_zone_id = db.Column(db.Integer, db.ForeignKey('zones.id'))
+    to_zone_id = db.Column(db.Integer, db.ForeignKey('zones.id'))
+    travel_method = db.Column(db.String(20))  # 'walk', 'lightfoot', 'fast_travel'
+    travel_start = db.Column(db.DateTime, default=datetime.utcnow)
+    travel_end = db.Column(db.DateTime)
+
 # Legacy compatibility - keep for existing combat system
 class Enemy(db.Model):
     __tablename__ = 'enemies'
@@ -386,6 +427,25 @@ class Enemy(db.Model):
     gold_reward = db.Column(db.Integer, default=5)
     
     zone = db.Column(db.String(50))
+    
+    # Set on transient enemies spawned from a template (not a column)
+    template_id = None
+    
+    @classmethod
+    def from_template(cls, template):
+        """Build a transient combat enemy from an EnemyTemplate"""
+        enemy = cls(
+            name=template.name,
+            level=template.level,
+            max_hp=template.hp,
+            attack_power=template.damage_max,
+            defense=template.defense,
+            agility=template.dodge,
+            xp_reward=template.xp_reward,
+            gold_reward=template.gold_min
+        )
+        enemy.template_id = template.id
+        return enemy
 
 # Legacy compatibility
 class Item(db.Model):
@@ -0,0 +1,313 @@
+"""
+Write-behind persistence for hot character fields.
+
+Combat and meditation change a handful of character columns on nearly every
+request. Instead of committing inside the request, the latest values are
+recorded in a WriteBehindQueue (only the fields the request changed), which
+coalesces them per character (last write wins per field) and flushes them in one batched UPDATE on a timer or when enough
+characters are pending.
+
+Every record is appended to a journal file before the request returns, so a
+crash loses nothing. Each process writes its own journal (the pid is part of
+the file name); when a queue is set up on an app it replays the journals of
+processes that are no longer running. Reads overlay pending values onto
+freshly loaded characters so players always see their latest state.
+
+Pending values live in this process only, so a worker's queue must be the
+only writer of its characters. With a combat store shared between workers
+(COMBAT_STORE=sqlite:///...) any worker can settle any fight, so the app
+sets WRITE_BEHIND_ENABLED to False and record() writes through instead.
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+
+from sqlalchemy import bindparam, inspect
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import db, Character
+
+class BackgroundFlusher:
+    """Daemon thread that calls flush() every interval seconds or when woken"""
+
+    def __init__(self, flush, interval, name):
+        self.flush = flush
+        self.interval = interval
+        self.name = name
+        self.app = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None and not self._stop.is_set():
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                if self.app is not None:
+                    self.app.logger.error(f"{self.name} flush failed: {e}")
+
+    def stop(self):
+        """Stop the thread; the caller does the final flush"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+# Character columns owned by the queue once a fight or meditation touches them
+FIELDS = (
+    'level', 'experience', 'gold',
+    'current_hp', 'current_chi',
+    'max_hp', 'max_chi', 'defense', 'dodge'
+)
+
+def changed_values(character):
+    """{field: value} for the FIELDS changed since the character was loaded
+
+    Only these are written, so a request that touched HP alone can't put back
+    the gold or experience another request awarded in the meantime. Values
+    applied by overlay() count as loaded, not changed.
+    """
+    attrs = inspect(character).attrs
+    return {field: getattr(character, field) for field in FIELDS if attrs[field].history.has_changes()}
+
+class WriteBehindQueue:
+    """Coalescing, journaled queue of character updates"""
+
+    def __init__(self, app=None, journal_path=None, flush_interval=1.0, max_pending=500):
+        self.max_pending = max_pending
+        self.journal_base = journal_path  # this process journals to '<base>.<pid>'
+        self.journal_path = None
+        self.write_through = False
+        self.app = None
+        self._pending = {}  # character_id -> {field: value}
+        self._flushing = {}  # batch being written, still visible to overlay()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher = BackgroundFlusher(self.flush, flush_interval, 'write-behind')
+        self._journal = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self._flusher.app = app
+        self._flusher.interval = app.config.get('WRITE_BEHIND_INTERVAL', self._flusher.interval)
+        self.max_pending = app.config.get('WRITE_BEHIND_MAX_PENDING', self.max_pending)
+        self.write_through = not app.config.get('WRITE_BEHIND_ENABLED', True)
+        if self.journal_base is None:
+            self.journal_base = app.config.get('WRITE_BEHIND_JOURNAL') or os.path.join(
+                app.instance_path, 'write_behind.journal'
+            )
+        self.journal_path = f'{self.journal_base}.{os.getpid()}'
+        atexit.register(self.stop)
+        self.recover()
+
+    # ============================================
+    # REQUEST PATH
+    # ============================================
+
+    def record(self, character):
+        """Queue the FIELDS this request changed on the character (or write
+        them now, in write-through mode)"""
+        values = changed_values(character)
+        if not values:
+            return
+        if self.write_through:
+            self._execute([dict({f'v_{field}': value for field, value in values.items()}, v_id=character.id)])
+            return
+        line = json.dumps({'id': character.id, 'values': values}, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._write_journal(line)
+            self._pending.setdefault(character.id, {}).update(values)
+            pending = len(self._pending)
+        self._flusher.ensure_started()
+        if pending >= self.max_pending:
+            self._flusher.wake()
+
+    def pending(self, char_id):
+        """Queued values not yet in the database, {field: value}"""
+        with self._lock:
+            values = dict(self._flushing.get(char_id, {}))
+            values.update(self._pending.get(char_id, {}))
+        return values
+
+    def overlay(self, character):
+        """Apply queued values to a loaded character without marking it dirty"""
+        if character is None:
+            return character
+        for field, value in self.pending(character.id).items():
+            set_committed_value(character, field, value)
+        return character
+
+    def overlay_row(self, row):
+        """Queued values applied to a projected row (a mapping with 'id')"""
+        values = self.pending(row['id'])
+        return dict(row, **values) if values else dict(row)
+
+    def __len__(self):
+        return len(self._pending)
+
+    # ============================================
+    # FLUSHING
+    # ============================================
+
+    def flush(self):
+        """Write all pending values in one transaction; returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+                flushing_path = self._rotate_journal()
+
+            rows = [dict({f'v_{field}': value for field, value in values.items()}, v_id=char_id)
+                    for char_id, values in batch.items()]
+            try:
+                self._execute(rows)
+            except Exception:
+                # Put the batch back under anything newer and keep the journal
+                with self._lock:
+                    for char_id, values in batch.items():
+                        self._pending[char_id] = dict(values, **self._pending.get(char_id, {}))
+                    self._flushing = {}
+                raise
+
+            with self._lock:
+                self._flushing = {}
+            if flushing_path:
+                os.remove(flushing_path)
+            return len(rows)
+
+    def _execute(self, rows):
+        table = Character.__table__
+        # Rows can carry different field sets after a journal replay
+        for fields, group in self._group_by_fields(rows).items():
+            statement = table.update().where(table.c.id == bindparam('v_id')).values(
+                {field: bindparam(f'v_{field}') for field in fields}
+            )
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(statement, group)
+
+    @staticmethod
+    def _group_by_fields(rows):
+        groups = {}
+        for row in rows:
+            fields = tuple(sorted(key[2:] for key in row if key != 'v_id'))
+            groups.setdefault(fields, []).append(row)
+        return groups
+
+    def stop(self):
+        """Stop the flusher and write whatever is still pending"""
+        self._flusher.stop()
+        if self.app is not None:
+            self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    # ============================================
+    # JOURNAL
+    # ============================================
+
+    def _write_journal(self, line):
+        if self._journal is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal.write(line)
+        # Reaches the OS before the request returns, so it survives a process crash
+        self._journal.flush()
+
+    def _rotate_journal(self):
+        """Move the journal aside for the batch being flushed"""
+        if self._journal is None:
+            return None
+        self._journal.close()
+        self._journal = None
+        flushing_path = self.journal_path + '.flushing'
+        if os.path.exists(flushing_path):
+            # An earlier failed flush: fold it into the rotated file
+            with open(flushing_path, 'a', encoding='utf-8') as out, open(self.journal_path, encoding='utf-8') as src:
+                out.write(src.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, flushing_path)
+        with open(flushing_path, 'rb') as f:
+            os.fsync(f.fileno())
+        return flushing_path
+
+    def _orphaned_journals(self):
+        """Journal files of processes that are no longer running (or of an
+        earlier run of this pid), oldest first"""
+        orphaned = []
+        for path in glob.glob(glob.escape(self.journal_base) + '*'):
+            suffix = path[len(self.journal_base):].split('.')
+            # '', '.flushing' (unversioned) or '.<pid>' / '.<pid>.flushing'
+            pid = suffix[1] if len(suffix) > 1 and suffix[1].isdigit() else None
+            if pid is not None and int(pid) != os.getpid() and _process_running(int(pid)):
+                continue
+            orphaned.append(path)
+        # A '.flushing' file holds older values than its live journal
+        return sorted(orphaned, key=lambda path: (os.path.getmtime(path), not path.endswith('.flushing')))
+
+    def recover(self):
+        """Replay journals left by crashed processes into the database; returns rows written"""
+        claimed = []
+        for i, path in enumerate(self._orphaned_journals()):
+            # Renaming claims the file, so two workers starting at once never replay it twice
+            claim = f'{self.journal_path}.recovering{i}'
+            try:
+                os.rename(path, claim)
+            except OSError:
+                continue
+            claimed.append(claim)
+
+        recovered = {}
+        for path in claimed:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn final line from the crash
+                    recovered.setdefault(entry['id'], {}).update(entry['values'])
+        if not recovered:
+            for path in claimed:
+                os.remove(path)
+            return 0
+        with self._lock:
+            for char_id, values in recovered.items():
+                self._pending[char_id] = dict(values, **self._pending.get(char_id, {}))
+                # Journal what we're about to flush so it survives another crash
+                self._write_journal(json.dumps({'id': char_id, 'values': values}, separators=(',', ':')) + '\n')
+        for path in claimed:
+            os.remove(path)
+        return self.flush()
+
+def _process_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # someone else's process
+    return True
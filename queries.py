@@ -0,0 +1,119 @@
+"""
+Query layer for hot endpoints.
+
+Each loader names an eager-loading profile so an endpoint issues a fixed,
+small number of SQL statements no matter how many skills, roles or items a
+character has. A per-request statement counter (exposed as the
+X-Query-Count header in debug mode) keeps those budgets visible.
+"""
+
+from flask import g, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import db, Character, CharacterInventory, CharacterSkill, Clan, Epithet
+from serializers import CHARACTER_SUMMARY, CHARACTER_DETAIL
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+# ============================================
+# LOADING PROFILES
+# ============================================
+
+def load_character_for_combat(char_id=None):
+    """Character with learned skills and their Skill rows (2 statements).
+
+    With no char_id, falls back to the first character like the legacy
+    start_combat did.
+    """
+    query = Character.query.options(
+        selectinload(Character.skills).joinedload(CharacterSkill.skill)
+    )
+    if char_id is None:
+        return query.order_by(Character.id).first()
+    return query.filter(Character.id == char_id).one_or_none()
+
+def load_character_gear(character):
+    """Equipped items with their templates and ornaments, and the active
+    epithet (1-2 statements); the inputs of a CombatProfile.
+    """
+    equipped = CharacterInventory.query.options(
+        joinedload(CharacterInventory.item),
+        joinedload(CharacterInventory.ornament_1),
+        joinedload(CharacterInventory.ornament_2)
+    ).filter(
+        CharacterInventory.character_id == character.id,
+        CharacterInventory.equipped_slot.isnot(None)
+    ).all()
+    epithet = None
+    if character.active_epithet_id is not None:
+        epithet = db.session.get(Epithet, character.active_epithet_id)
+    return equipped, epithet
+
+# ============================================
+# PROJECTIONS
+# ============================================
+
+# Columns behind the character list and detail endpoints; rows come back as
+# plain mappings instead of hydrated Character objects
+CHARACTER_LIST_COLUMNS = CHARACTER_SUMMARY.columns(Character)
+CHARACTER_DETAIL_COLUMNS = CHARACTER_DETAIL.columns(Character)
+
+def _character_page(columns, account_id, after_id, limit):
+    # No account means the characters nobody has claimed yet
+    owner = Character.account_id.is_(None) if account_id is None else Character.account_id == account_id
+    return select(*columns).where(owner, Character.id > after_id).order_by(Character.id).limit(limit)
+
+def iter_character_rows(account_id=None, after_id=0, limit=50):
+    """One keyset page of character list rows, ordered by id (1 statement).
+
+    Streams rows from the cursor instead of building a list; pass the last
+    id seen as after_id for the next page.
+    """
+    query = _character_page(CHARACTER_LIST_COLUMNS, account_id, after_id, limit)
+    return db.session.execute(query.execution_options(yield_per=100)).mappings()
+
+def next_character_cursor(account_id=None, after_id=0, limit=50):
+    """after_id for the page that follows, or None if no characters follow this page (1 statement)"""
+    # The page's last id and the one after it, if any
+    query = _character_page((Character.id,), account_id, after_id, limit)
+    ids = db.session.execute(query.offset(limit - 1).limit(2)).scalars().all()
+    return ids[0] if len(ids) == 2 else None
+
+def load_character_row(char_id):
+    """Character detail columns as a mapping, or None (1 statement)"""
+    query = select(*CHARACTER_DETAIL_COLUMNS).where(Character.id == char_id)
+    return db.session.execute(query).mappings().first()
+
+def load_clans_with_roles():
+    """All clans with their roles (2 statements)"""
+    return Clan.query.options(selectinload(Clan.roles)).order_by(Clan.id).all()
+
+# ============================================
+# QUERY COUNTER
+# ============================================
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+def query_count():
+    """Statements executed so far in the current app/request context"""
+    return g.get('query_count', 0)
+
+def install_query_counter(app):
+    """Report each request's statement count in a response header.
+
+    On in debug mode, or anywhere with QUERY_COUNT_HEADER set in config.
+    Streamed responses (the character list, event streams) run their queries
+    after the headers are sent, so they get no header rather than a wrong one.
+    """
+    @app.after_request
+    def add_query_count_header(response):
+        if response.is_streamed:
+            return response
+        if app.debug or app.config.get('QUERY_COUNT_HEADER'):
+            response.headers[QUERY_COUNT_HEADER] = str(query_count())
+        return response
@@ -0,0 +1,176 @@
+"""
+Real-time combat scheduler.
+
+Instead of one request per turn, fights handed to a CombatScheduler play
+out on a clock: each side acts every Combat.action_interval_ms (faster with
+Flow/agility), the initiative roll decides who strikes first, and skills
+wait out their cooldown_ms before they can be used again. Every pending
+action of every fight sits in one heap keyed by its due time, so a single
+thread sleeps until the next action is due and advances thousands of
+fights without a thread (or a timer) per fight.
+
+run_until_idle() drives the same heap on a virtual clock, resolving fights
+as fast as the CPU allows (auto-combat, simulations, tests).
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+CHARACTER = 'character'
+ENEMY = 'enemy'
+
+class ScheduledFight:
+    __slots__ = ('key', 'combat', 'on_action', 'on_finish')
+
+    def __init__(self, key, combat, on_action, on_finish):
+        self.key = key
+        self.combat = combat
+        self.on_action = on_action
+        self.on_finish = on_finish
+
+class CombatScheduler:
+    """Heap-based event loop for many concurrent real-time fights"""
+
+    def __init__(self, tick_ms=50, time_scale=1.0, clock=time.monotonic, logger=None):
+        self.tick_ms = tick_ms  # actions due this close together run in one wakeup
+        self.time_scale = time_scale
+        self.clock = clock
+        self.logger = logger or logging.getLogger(__name__)
+        self._origin = clock()
+        self._heap = []  # (due_ms, seq, fight, actor)
+        self._seq = itertools.count()
+        self._fights = {}  # key -> ScheduledFight
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def now_ms(self):
+        return int((self.clock() - self._origin) * 1000 * self.time_scale)
+
+    def _push(self, due_ms, fight, actor):
+        heapq.heappush(self._heap, (due_ms, next(self._seq), fight, actor))
+
+    # ============================================
+    # FIGHTS
+    # ============================================
+
+    def add(self, key, combat, on_action=None, on_finish=None, start_ms=None):
+        """Start running a fight; callbacks get (key, combat) after its actions and at the end"""
+        now = self.now_ms() if start_ms is None else start_ms
+        with self._cond:
+            if key in self._fights:
+                raise ValueError(f"Fight {key!r} is already scheduled")
+            fight = self._fights[key] = ScheduledFight(key, combat, on_action, on_finish)
+            # The initiative winner acts at once, the other side half an interval later
+            first, second = (CHARACTER, ENEMY) if combat.calculate_initiative() else (ENEMY, CHARACTER)
+            self._push(now, fight, first)
+            self._push(now + combat.action_interval_ms(second) // 2, fight, second)
+            self._cond.notify()
+        return fight
+
+    def remove(self, key):
+        """Stop running a fight and return its Combat (or None)"""
+        with self._cond:
+            fight = self._fights.pop(key, None)
+        # Its heap entries are skipped when they come due
+        return fight.combat if fight else None
+
+    def __contains__(self, key):
+        return key in self._fights
+
+    def __len__(self):
+        return len(self._fights)
+
+    # ============================================
+    # EVENT LOOP
+    # ============================================
+
+    def advance(self, now_ms):
+        """Run every action due at or before now_ms; returns the number run"""
+        acted, finished, count = {}, [], 0
+        with self._cond:
+            heap = self._heap
+            while heap and heap[0][0] <= now_ms:
+                due, _, fight, actor = heapq.heappop(heap)
+                if self._fights.get(fight.key) is not fight:
+                    continue  # removed or finished
+                combat = fight.combat
+                try:
+                    combat.act(actor, due)
+                except Exception:
+                    self.logger.exception(f"Real-time fight {fight.key!r} failed; dropping it")
+                    del self._fights[fight.key]
+                    continue
+                count += 1
+                if combat.is_over:
+                    del self._fights[fight.key]
+                    acted.pop(fight.key, None)
+                    finished.append(fight)
+                else:
+                    self._push(due + combat.action_interval_ms(actor), fight, actor)
+                    acted[fight.key] = fight
+
+        # One callback per fight per wakeup, outside the lock
+        for fight in acted.values():
+            self._callback(fight, fight.on_action)
+        for fight in finished:
+            self._callback(fight, fight.on_finish)
+        return count
+
+    def _callback(self, fight, callback):
+        if callback is None:
+            return
+        try:
+            callback(fight.key, fight.combat)
+        except Exception:
+            self.logger.exception(f"Callback for real-time fight {fight.key!r} failed")
+
+    def next_due_ms(self):
+        with self._cond:
+            return self._heap[0][0] if self._heap else None
+
+    def run_until_idle(self, max_actions=None):
+        """Resolve every scheduled fight on a virtual clock; returns actions run"""
+        total = 0
+        while self._fights and (max_actions is None or total < max_actions):
+            due = self.next_due_ms()
+            if due is None:
+                break
+            total += self.advance(due)
+        return total
+
+    # ============================================
+    # REAL-TIME THREAD
+    # ============================================
+
+    def start(self):
+        """Run the scheduler on a background thread (idempotent)"""
+        with self._cond:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='combat-scheduler', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping and not self._heap:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                wait_ms = self._heap[0][0] - self.now_ms()
+                if wait_ms > 0:
+                    self._cond.wait(wait_ms / 1000 / self.time_scale)
+                    continue
+            self.advance(self.now_ms() + self.tick_ms)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,159 @@
+"""
+JSON serialization for API responses.
+
+Responses are described by Schemas (response key -> model attribute) rather
+than dicts built by hand in each route, and encoded straight to bytes by
+dumps(): orjson when it is installed (pip install orjson), otherwise a
+single reused compact stdlib encoder. Both give the same output for API
+values. FastJSONProvider routes Flask's
+jsonify() through the same encoder, and Payloads hold pre-encoded bodies
+(with ETags) for content that never changes between deploys.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from operator import attrgetter, itemgetter
+
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _fallback(value):
+    """Types the encoders don't handle natively (NumPy scalars/arrays, then Flask's defaults)"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return DefaultJSONProvider.default(value)
+
+_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=_fallback)
+_sorted_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=_fallback,
+                                   sort_keys=True)
+
+def stdlib_dumps(value, sort_keys=False):
+    """Compact UTF-8 JSON bytes from the stdlib encoder"""
+    return (_sorted_encoder if sort_keys else _encoder).encode(value).encode('utf-8')
+
+if orjson is not None:
+    # Datetimes go through Flask's default so both encoders format them alike
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def orjson_dumps(value, sort_keys=False):
+        """Compact UTF-8 JSON bytes from orjson"""
+        options = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTIONS
+        return orjson.dumps(value, default=_fallback, option=options)
+
+    dumps = orjson_dumps
+else:
+    orjson_dumps = None
+    dumps = stdlib_dumps
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes jsonify() responses with dumps().
+
+    Defaults to compact, unsorted, non-ASCII-escaped output. Setting
+    ensure_ascii, or compact to False (or None in debug mode), hands
+    encoding back to DefaultJSONProvider; sort_keys is honored either way.
+    """
+    ensure_ascii = False
+    sort_keys = False
+    compact = True
+
+    def _fast(self):
+        compact = self.compact if self.compact is not None else not self._app.debug
+        return compact and not self.ensure_ascii
+
+    def dumps(self, obj, **kwargs):
+        if kwargs or not self._fast():
+            kwargs.setdefault('default', _fallback)
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, self.sort_keys).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if not self._fast() or (args and kwargs):
+            return super().response(*args, **kwargs)
+        # Same argument handling as jsonify(): one value, several (a list) or keywords (a dict)
+        obj = args[0] if len(args) == 1 else args or kwargs or None
+        return self._app.response_class(dumps(obj, self.sort_keys), mimetype=self.mimetype)
+
+# ============================================
+# SCHEMAS
+# ============================================
+
+class Schema:
+    """Response keys mapped to model attributes, dumped from objects or rows"""
+
+    def __init__(self, *names, **renamed):
+        fields = {name: name for name in names}
+        fields.update(renamed)
+        if len(fields) < 2:
+            raise ValueError("A Schema needs at least two fields")
+        self.keys = tuple(fields)
+        self.attributes = tuple(fields.values())
+        # One C-level call fetches every field as a tuple
+        self._getattrs = attrgetter(*self.attributes)
+        self._getitems = itemgetter(*self.attributes)
+
+    def extend(self, *names, **renamed):
+        """A new Schema with these fields added"""
+        return Schema(**dict(zip(self.keys, self.attributes)), **{name: name for name in names}, **renamed)
+
+    def dump(self, obj):
+        """Dict of an ORM object's (or any object's) attributes"""
+        return dict(zip(self.keys, self._getattrs(obj)))
+
+    def dump_row(self, row):
+        """Dict of a mapping's values, e.g. a projected SQLAlchemy row"""
+        return dict(zip(self.keys, self._getitems(row)))
+
+    def columns(self, model):
+        """The model's columns behind this schema, for select()"""
+        return tuple(dict.fromkeys(getattr(model, attribute) for attribute in self.attributes))
+
+# Character list cards
+CHARACTER_SUMMARY = Schema(
+    'id', 'name', 'level', 'sub_level',
+    'max_hp', 'max_chi', 'body', 'spirit', 'flow',
+    hp='current_hp', chi='current_chi'
+)
+# Character sheet (/api/character/<id>)
+CHARACTER_DETAIL = CHARACTER_SUMMARY.extend(
+    'clan_id', 'role_id', 'tier', 'defense', 'gold', 'current_zone_id',
+    xp='experience'
+)
+# Character.to_dict()
+CHARACTER = CHARACTER_SUMMARY.extend(
+    'tier', 'defense', 'gold', 'good_karma', 'bad_karma', 'clan_id', 'role_id',
+    xp='experience'
+)
+# HP/chi after meditating
+CHARACTER_HEALTH = Schema('id', 'max_hp', 'max_chi', hp='current_hp', chi='current_chi')
+# Vitals and progress pushed on the character stream
+CHARACTER_VITALS = Schema(
+    'max_hp', 'max_chi', 'level', 'gold',
+    hp='current_hp', chi='current_chi', xp='experience'
+)
+
+# ============================================
+# PRE-ENCODED PAYLOADS
+# ============================================
+
+@dataclass(frozen=True, slots=True)
+class Payload:
+    """Pre-encoded JSON body and its ETag"""
+    body: bytes
+    etag: str
+
+def encode_payload(version, data):
+    """Payload for content that only changes with version (keys sorted so ETags are stable)"""
+    body = dumps(data, sort_keys=True)
+    return Payload(body, f'{version}-{hashlib.sha1(body).hexdigest()[:16]}')
+
+def payload_response(payload):
+    """Serve a pre-encoded payload, answering 304 when the client's ETag matches"""
+    response = Response(payload.body, mimetype='application/json')
+    response.set_etag(payload.etag)
+    return response.make_conditional(request)
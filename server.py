@@ -1,20 +1,113 @@
-from flask import Flask, render_template, jsonify, request, session
-from models import db, Character, Enemy, Clan, Role, Skill, Zone, ItemTemplate, CharacterSkill, EnemyTemplate, ZoneEnemy
-from combat import Combat
+from flask import Flask, Response, render_template, jsonify, request, session, abort, stream_with_context
+from models import db, Character, Enemy, CharacterSkill, TravelLog
+from combat import Combat, TurnOutcome, ACTIONS, MAX_BATCH_TURNS
+from combat_store import create_combat_store, CharacterBusy
+from game_data import get_game_data
+from serializers import (FastJSONProvider, payload_response, dumps,
+                         CHARACTER_SUMMARY, CHARACTER_DETAIL, CHARACTER_HEALTH, CHARACTER_VITALS)
+from queries import (load_character_for_combat, install_query_counter, iter_character_rows,
+                     next_character_cursor, load_character_row)
+from combat_profile import combat_profiles
+from damage_model import win_probability
+from persistence import WriteBehindQueue, FIELDS
+from combat_log import CombatLogWriter, ROLLUP_KEYS, win_rates
+from rng import CombatRNG, numpy_stream
+from loot import LOOT_STREAM, add_to_inventory
+from db_profile import init_database_engine
+from streams import create_event_broker, COMBAT, CHARACTER, ZONE, parse_last_event_id
+from zone_graph import TRAVEL_METHODS, WALK
+from scheduler import CombatScheduler
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import wraps
+from sqlalchemy.orm.attributes import set_committed_value
 import os
-import random
+import time
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///dragons.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///dragons.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 'production' (WAL, pooled, tuned pragmas) or 'development' (SQLite defaults)
+app.config['DATABASE_PROFILE'] = os.environ.get('DATABASE_PROFILE', 'production')
 app.config['SESSION_TYPE'] = 'filesystem'
+# 'memory' for a single worker, 'sqlite:///combat_sessions.db' to share fights between workers
+app.config['COMBAT_STORE'] = os.environ.get('COMBAT_STORE', 'memory')
+app.config['COMBAT_TTL'] = int(os.environ.get('COMBAT_TTL', 30 * 60))
+# Where stream events go: 'memory' (this process) or a SQLite file every worker polls
+app.config['EVENT_BROKER'] = os.environ.get('EVENT_BROKER', app.config['COMBAT_STORE'])
+# Bump to reload cached clans/roles/skills/zones/enemies after seed data changes
+app.config['GAME_DATA_VERSION'] = os.environ.get('GAME_DATA_VERSION', '1')
+# HP/chi/rewards are flushed in batches this often (seconds) or once this many characters are pending
+app.config['WRITE_BEHIND_INTERVAL'] = float(os.environ.get('WRITE_BEHIND_INTERVAL', 1.0))
+app.config['WRITE_BEHIND_MAX_PENDING'] = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', 500))
+# Journal file prefix (default instance/write_behind.journal)
+app.config['WRITE_BEHIND_JOURNAL'] = os.environ.get('WRITE_BEHIND_JOURNAL')
+# Queued values are per process, so with a shared combat store (any worker may
+# settle any fight) character updates are written through instead
+app.config['WRITE_BEHIND_ENABLED'] = app.config['COMBAT_STORE'] == 'memory'
 
-db.init_app(app)
+init_database_engine(app, db)
+install_query_counter(app)
 
-# In-memory combat sessions (replace with Redis/DB later)
-# Key: character_id, Value: combat instance
-active_combats = {}
+# Active combat sessions
+# Key: character_id, Value: CombatState
+combat_store = create_combat_store(app.config['COMBAT_STORE'], ttl=app.config['COMBAT_TTL'])
+
+# Character updates from combat and meditation, committed in the background
+write_behind = WriteBehindQueue(app)
+# Finished fights, batched into the combat_log table
+combat_log = CombatLogWriter(app)
+# Per-character server-sent event channels (/api/stream/<id>)
+broker = create_event_broker(app.config['EVENT_BROKER'], logger=app.logger)
+
+# Fights running in real time (/api/combat_realtime) on one background thread
+combat_scheduler = CombatScheduler(logger=app.logger)
+# Real-time fights settle here, so database writes never hold up the scheduler's ticks
+settlement_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='settlement')
+SETTLE_ATTEMPTS = 3
+
+def character_route(view):
+    """Run a view that changes one character (body: character_id) under that
+    character's combat store lock, so its requests never interleave
+    """
+    @wraps(view)
+    def locked_view(*args, **kwargs):
+        char_id = (request.get_json(silent=True) or {}).get('character_id')
+        if type(char_id) is not int:
+            return view(*args, **kwargs)  # the view rejects it
+        with combat_store.lock(char_id):
+            return view(*args, **kwargs)
+    return locked_view
+
+@app.errorhandler(CharacterBusy)
+def character_busy(error):
+    return jsonify({'error': 'Another request for this character is still running'}), 409
+
+def publish_character(char, **deltas):
+    """Push a character's current vitals and progress to its stream"""
+    broker.publish(char.id, CHARACTER, dict(CHARACTER_VITALS.dump(char), **deltas))
+
+def load_combat(char_id):
+    """Rebuild a stored fight with this request's character and enemy objects"""
+    if type(char_id) is not int:
+        return None
+    state = combat_store.get(char_id)
+    if state is None:
+        return None
+    
+    character = write_behind.overlay(load_character_for_combat(char_id))
+    template = get_game_data().enemy_templates.get(state.enemy_template_id)
+    if not character or not template:
+        combat_store.delete(char_id)
+        return None
+    
+    combat = Combat.from_state(state, character, Enemy.from_template(template), character.skills,
+                               profile=combat_profiles.get(character))
+    # Rewards reach the database through write_behind, never by flushing the session
+    db.session.expunge(character)
+    return combat
 
 @app.route('/')
 def index():
@@ -31,24 +124,7 @@ def combat_page():
 @app.route('/api/clans', methods=['GET'])
 def get_clans():
     """Get all available clans with their roles."""
-    clans = Clan.query.all()
-    result = []
-    for clan in clans:
-        roles = Role.query.filter_by(clan_id=clan.id).all()
-        result.append({
-            'id': clan.id,
-            'name': clan.name,
-            'faction': clan.faction,
-            'description': clan.description,
-            'roles': [{
-                'id': r.id,
-                'name': r.name,
-                'archetype': r.archetype,
-                'primary_weapon': r.primary_weapon,
-                'description': r.description
-            } for r in roles]
-        })
-    return jsonify(result)
+    return payload_response(get_game_data().clans_payload)
 
 @app.route('/api/character/create', methods=['POST'])
 def create_character():
@@ -63,36 +139,26 @@ def create_character():
     if Character.query.filter_by(name=data['name']).first():
         return jsonify({'error': 'Character name already exists'}), 400
     
-    # Get clan and role
-    clan = Clan.query.get(data['clan_id'])
-    role = Role.query.get(data['role_id'])
+    # Get clan and role (ids may arrive as strings from form-style clients)
+    try:
+        clan_id, role_id = int(data['clan_id']), int(data['role_id'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid clan or role'}), 400
+    game_data = get_game_data()
+    clan = game_data.clans.get(clan_id)
+    role = game_data.roles.get(role_id)
     
     if not clan or not role or role.clan_id != clan.id:
         return jsonify({'error': 'Invalid clan or role'}), 400
     
     # Create character
-    char = Character(
-        name=data['name'],
-        clan_id=clan.id,
-        role_id=role.id,
-        faction=clan.faction,
-        body=10 + (role.body_bonus or 0),
-        spirit=10 + (role.spirit_bonus or 0),
-        flow=10 + (role.flow_bonus or 0),
-        current_zone_id=clan.starting_zone_id
-    )
-    
-    char.calculate_derived_stats()
+    char = Character.from_role(data['name'], clan, role, account_id=session.get('account_id'))
     
     db.session.add(char)
     db.session.flush()  # Get character ID
     
     # Learn starting skills for this role
-    starting_skills = Skill.query.filter(
-        Skill.clan_id == clan.id,
-        Skill.role_id == role.id,
-        Skill.unlock_level == 1
-    ).all()
+    starting_skills = game_data.starting_skills(clan.id, role.id)
     
     for skill in starting_skills:
         char_skill = CharacterSkill(
@@ -112,73 +178,141 @@ def create_character():
         'character': char.to_dict()
     })
 
+CHARACTER_PAGE_SIZE = 50
+MAX_CHARACTER_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = 'X-Next-After-Id'
+
 @app.route('/api/characters', methods=['GET'])
 def get_characters():
-    """Get all characters for current user (simplified - no auth yet)."""
-    characters = Character.query.all()
-    result = [{
-        'id': c.id,
-        'name': c.name,
-        'level': c.level,
-        'sub_level': c.sub_level,
-        'hp': c.current_hp,
-        'max_hp': c.max_hp,
-        'chi': c.current_chi,
-        'max_chi': c.max_chi,
-        'body': c.body,
-        'spirit': c.spirit,
-        'flow': c.flow
-    } for c in characters]
-    return jsonify(result)
+    """Get one page of characters (simplified - no auth yet).
+
+    Query: ?after_id=<last id seen>&limit=50. Lists the session account's
+    characters, or the ones without an account when nobody is signed in;
+    X-Next-After-Id holds the next page's after_id when more characters follow.
+    """
+    account_id = session.get('account_id')
+    after_id = request.args.get('after_id', 0, type=int)
+    limit = max(1, min(request.args.get('limit', CHARACTER_PAGE_SIZE, type=int), MAX_CHARACTER_PAGE_SIZE))
+    next_after_id = next_character_cursor(account_id, after_id, limit)
+    
+    def generate():
+        # Rows are encoded as they come off the cursor
+        yield b'['
+        for i, row in enumerate(iter_character_rows(account_id, after_id, limit)):
+            item = dumps(CHARACTER_SUMMARY.dump_row(write_behind.overlay_row(row)))
+            yield b',' + item if i else item
+        yield b']'
+    
+    response = Response(stream_with_context(generate()), mimetype='application/json')
+    if next_after_id is not None:
+        response.headers[NEXT_CURSOR_HEADER] = str(next_after_id)
+    return response
 
 @app.route('/api/character/<int:char_id>', methods=['GET'])
 def get_character(char_id):
     """Get a single character's full details."""
-    char = Character.query.get_or_404(char_id)
-    
-    return jsonify({
-        'id': char.id,
-        'name': char.name,
-        'clan_id': char.clan_id,
-        'role_id': char.role_id,
-        'level': char.level,
-        'sub_level': char.sub_level,
-        'tier': char.tier,
-        'xp': char.experience,
-        'hp': char.current_hp,
-        'max_hp': char.max_hp,
-        'chi': char.current_chi,
-        'max_chi': char.max_chi,
-        'body': char.body,
-        'spirit': char.spirit,
-        'flow': char.flow,
-        'defense': char.defense,
-        'gold': char.gold,
-        'current_zone_id': char.current_zone_id
-    })
+    row = load_character_row(char_id)
+    if row is None:
+        abort(404)
+    return jsonify(CHARACTER_DETAIL.dump_row(write_behind.overlay_row(row)))
 
 @app.route('/api/zone/<int:zone_id>', methods=['GET'])
 def get_zone(zone_id):
     """Get zone information."""
-    zone = Zone.query.get_or_404(zone_id)
+    payload = get_game_data().zone_payloads.get(zone_id)
+    if payload is None:
+        abort(404)
+    
+    return payload_response(payload)
+
+@app.route('/api/zone/<int:from_zone_id>/route/<int:to_zone_id>', methods=['GET'])
+def get_route(from_zone_id, to_zone_id):
+    """Shortest route between two zones.
+
+    Query: ?level=<n> to only pass through zones recommended for that level.
+    """
+    graph = get_game_data().zone_graph
+    if from_zone_id not in graph.zones or to_zone_id not in graph.zones:
+        abort(404)
+    level = request.args.get('level', type=int)
+    path = graph.route(from_zone_id, to_zone_id, level)
+    if path is None:
+        return jsonify({'error': 'No route between these zones'}), 404
+    
+    return jsonify({'distance': len(path) - 1, 'level': level, 'path': graph.describe(path)})
+
+@app.route('/api/character/<int:char_id>/recommended_zone', methods=['GET'])
+def get_recommended_zone(char_id):
+    """Route to the nearest hunting zone recommended for the character's level."""
+    row = load_character_row(char_id)
+    if row is None:
+        abort(404)
+    row = write_behind.overlay_row(row)
+    graph = get_game_data().zone_graph
+    path = graph.recommended_route(row['current_zone_id'], row['level'])
+    if path is None:
+        return jsonify({'error': 'No reachable zone for this level'}), 404
+    
+    return jsonify({
+        'character_id': char_id,
+        'zone': graph.describe(path[-1:])[0],
+        'distance': len(path) - 1,
+        'path': graph.describe(path)
+    })
+
+@app.route('/api/travel', methods=['POST'])
+@character_route
+def travel():
+    """Move a character toward a zone.
+
+    Body: character_id, zone_id, method ('walk' one zone, 'lightfoot' a few
+    zones along the route, 'fast_travel' straight to a safe zone).
+    """
+    data = request.json
+    char_id = data.get('character_id')
+    method = data.get('method', WALK)
+    if method not in TRAVEL_METHODS:
+        return jsonify({'error': f"'method' must be one of {', '.join(TRAVEL_METHODS)}"}), 400
+    
+    char = write_behind.overlay(Character.query.get_or_404(char_id))
+    if char.id in combat_store or char.id in combat_scheduler:
+        return jsonify({'error': 'Cannot travel during combat'}), 409
+    
+    graph = get_game_data().zone_graph
+    if type(data.get('zone_id')) is not int:
+        return jsonify({'error': "'zone_id' must be an integer"}), 400
+    if data['zone_id'] not in graph.zones:
+        abort(404)
+    from_zone_id = char.current_zone_id
+    to_zone_id = graph.travel_destination(from_zone_id, data['zone_id'], method, char.level)
+    if to_zone_id is None:
+        return jsonify({'error': f"Cannot {method.replace('_', ' ')} there from here"}), 400
+    
+    now = datetime.utcnow()
+    char.current_zone_id = to_zone_id
+    db.session.add(TravelLog(character_id=char.id, from_zone_id=from_zone_id, to_zone_id=to_zone_id,
+                             travel_method=method, travel_start=now, travel_end=now))
+    db.session.commit()
+    
+    zone = graph.zones[to_zone_id]
+    broker.publish(char.id, ZONE, {'zone_id': zone.id, 'name': zone.name,
+                                   'from_zone_id': from_zone_id, 'method': method})
     
     return jsonify({
-        'id': zone.id,
-        'name': zone.name,
-        'description': zone.description,
-        'zone_type': zone.zone_type,
-        'recommended_level_min': zone.recommended_level_min,
-        'recommended_level_max': zone.recommended_level_max,
-        'is_safe_zone': zone.is_safe_zone
+        'character_id': char.id,
+        'zone': {'id': zone.id, 'name': zone.name},
+        'arrived': to_zone_id == data['zone_id'],
+        'remaining': graph.distance(to_zone_id, data['zone_id'], char.level)
     })
 
 @app.route('/api/meditate', methods=['POST'])
+@character_route
 def meditate():
     """Restore HP and Chi through meditation."""
     data = request.json
     char_id = data.get('character_id')
     
-    char = Character.query.get_or_404(char_id)
+    char = write_behind.overlay(Character.query.get_or_404(char_id))
     
     # Restore based on spirit stat
     hp_restore = min(char.spirit * 10, char.max_hp - char.current_hp)
@@ -187,112 +321,81 @@ def meditate():
     char.current_hp = min(char.max_hp, char.current_hp + hp_restore)
     char.current_chi = min(char.max_chi, char.current_chi + chi_restore)
     
-    db.session.commit()
+    write_behind.record(char)
+    publish_character(char, hp_delta=hp_restore, chi_delta=chi_restore)
     
     return jsonify({
         'hp_restored': hp_restore,
         'chi_restored': chi_restore,
-        'character': {
-            'id': char.id,
-            'hp': char.current_hp,
-            'max_hp': char.max_hp,
-            'chi': char.current_chi,
-            'max_chi': char.max_chi
-        }
+        'character': CHARACTER_HEALTH.dump(char)
     })
 
 @app.route('/api/start_combat', methods=['POST'])
+@character_route
 def start_combat():
     """Initialize a new combat"""
     data = request.json
     char_id = data.get('character_id')
     
-    if char_id:
-        character = Character.query.get_or_404(char_id)
-    else:
-        # Fallback to first character
-        character = Character.query.first()
-    
-    # Get enemies from character's current zone
-    zone_enemies = ZoneEnemy.query.filter_by(
-        zone_id=character.current_zone_id,
-        is_boss=False  # Don't spawn bosses randomly
-    ).all()
-    
-    if not zone_enemies:
-        # Fallback: Get enemies near character's level
-        all_templates = EnemyTemplate.query.filter(
-            EnemyTemplate.level >= character.level - 2,
-            EnemyTemplate.level <= character.level + 2
-        ).all()
-        
-        if not all_templates:
-            # Ultimate fallback: any enemy
-            all_templates = EnemyTemplate.query.all()
-        
-        if not all_templates:
-            return jsonify({'error': 'No enemies available'}), 404
-        
-        selected_template = random.choice(all_templates)
-    else:
-        # Weighted random selection from zone enemies
-        total_weight = sum(ze.spawn_weight for ze in zone_enemies)
-        rand_val = random.randint(1, total_weight)
-        cumulative = 0
-        selected_template = None
-        
-        for ze in zone_enemies:
-            cumulative += ze.spawn_weight
-            if rand_val <= cumulative:
-                selected_template = ze.enemy
-                break
-        
-        if not selected_template:
-            selected_template = zone_enemies[0].enemy
+    # Loads the character's skills too; falls back to the first character without an id
+    character = write_behind.overlay(load_character_for_combat(char_id or None))
+    if character is None:
+        abort(404)
+    if character.id in combat_scheduler:
+        return jsonify({'error': 'A real-time fight is already running'}), 409
     
-    # Create a temporary Enemy instance from the template
-    enemy = Enemy(
-        name=selected_template.name,
-        level=selected_template.level,
-        max_hp=selected_template.hp,
-        attack_power=selected_template.damage_max,
-        defense=selected_template.defense,
-        agility=selected_template.dodge,
-        xp_reward=selected_template.xp_reward,
-        gold_reward=selected_template.gold_min
-    )
+    # Pick from the zone's spawn table (bosses don't spawn randomly), falling
+    # back to enemies near the character's level. The fight's own RNG makes
+    # the spawn part of its replayable stream.
+    rng = CombatRNG()
+    selected_template = get_game_data().spawn_tables.pick(character.current_zone_id, character.level, rng)
     
-    # Load character's equipped skills
-    char_skills = CharacterSkill.query.filter_by(character_id=character.id).all()
+    if not selected_template:
+        return jsonify({'error': 'No enemies available'}), 404
     
-    combat = Combat(character, enemy, char_skills)
+    # Create a temporary Enemy instance from the template
+    enemy = Enemy.from_template(selected_template)
+    
+    combat = Combat(character, enemy, character.skills, rng=rng, profile=combat_profiles.get(character))
     
     # Use character_id as the key for easier lookup
-    active_combats[character.id] = combat
+    combat_store.put(character.id, combat.to_state())
+    state = combat.get_state()
+    broker.publish(character.id, COMBAT, state)
     
     return jsonify({
         'combat_id': character.id,
-        'state': combat.get_state()
+        'state': state
     })
 
-@app.route('/api/combat_action', methods=['POST'])
-def combat_action():
-    """Execute a combat turn"""
-    data = request.json
-    char_id = data.get('character_id')
-    
-    if not char_id or char_id not in active_combats:
-        return jsonify({'error': 'No active combat for this character'}), 404
-    
-    combat = active_combats[char_id]
-    action = data.get('action', 'attack')
-    
-    state = combat.execute_turn(action)
-    
-    # Handle combat completion
+def award_loot(char_id, combat):
+    """Roll the enemy's drops (replayable from the fight's seed) and stack them into the bag;
+    committed with the rest of the settlement
+    """
+    loot_tables = get_game_data().loot_tables
+    loot = loot_tables.roll(combat.enemy.template_id, numpy_stream(combat.seed, LOOT_STREAM))
+    add_to_inventory(char_id, loot, loot_tables.stack_sizes)
+    return loot_tables.describe(loot)
+
+def save_fight(char_id, combat, state):
+    """Write a played fight back to the store, or remove it once it is over.
+
+    Compare-and-swap against the record the fight was loaded from: False
+    means another request advanced or settled it first.
+    """
+    if state['victory'] or state['defeat']:
+        return combat_store.delete(char_id, expected=combat.resumed_from)
+    return combat_store.put(char_id, combat.to_state(), expected=combat.resumed_from)
+
+def fight_conflict():
+    return jsonify({'error': 'This fight was changed by another request'}), 409
+
+def settle_combat(char_id, combat, state):
+    """Award victory rewards for a fight this caller owns (see save_fight)"""
+    char = combat.character
+    loot = []
     if state['victory']:
         # Award XP and gold
-        char = combat.character
         char.experience += combat.enemy.xp_reward
         char.gold += combat.enemy.gold_reward
         
@@ -301,20 +404,241 @@ def combat_action():
         if char.experience >= xp_needed:
             char.level += 1
             char.experience -= xp_needed
-            char.calculate_derived_stats()
+            char.calculate_derived_stats(combat.profile)
             state['level_up'] = True
         
-        db.session.commit()
+        loot = award_loot(char.id, combat)
         state['rewards'] = {
             'xp': combat.enemy.xp_reward,
-            'gold': combat.enemy.gold_reward
+            'gold': combat.enemy.gold_reward,
+            'loot': loot
         }
     
-    # Clean up finished combats
+    # Clean up finished combats and keep the HP/chi the fight ended with
+    if state['victory'] or state['defeat']:
+        # A defeated character is left for dead at 1 HP, not 0
+        char.current_hp = max(1, combat.character_hp)
+        char.current_chi = combat.character_chi
+        # Loot first: write-through character updates take their own connection
+        db.session.commit()
+        write_behind.record(char)
+        combat_log.record(
+            char.id, combat.enemy.template_id, char.current_zone_id,
+            'victory' if state['victory'] else 'defeat',
+            xp_gained=combat.enemy.xp_reward if state['victory'] else 0,
+            gold_gained=combat.enemy.gold_reward if state['victory'] else 0,
+            loot_gained=loot or None,
+            started_at=combat.started_at
+        )
+    
+    broker.publish(char_id, COMBAT, state)
     if state['victory'] or state['defeat']:
-        del active_combats[char_id]
+        publish_character(char)
+    
+    return state
+
+def realtime_state(combat):
+    """State with the events since the last push, advancing the push cursor"""
+    state = combat.get_state()
+    combat.log_cursor = combat.log.last_seq
+    return state
+
+def publish_realtime(char_id, combat):
+    broker.publish(char_id, COMBAT, realtime_state(combat))
+
+def finish_realtime(char_id, combat):
+    # Called on the scheduler thread: hand the settlement to a worker
+    settlement_pool.submit(settle_realtime, char_id, combat, realtime_state(combat))
+
+def settle_realtime(char_id, combat, state):
+    """Settle a finished real-time fight, retrying before giving up on its rewards.
+
+    Each attempt takes the character's lock and starts from its current
+    values, so rewards land on top of whatever other requests wrote during
+    the fight and a failed attempt leaves nothing half-applied.
+    """
+    for attempt in range(1, SETTLE_ATTEMPTS + 1):
+        try:
+            with app.app_context(), combat_store.lock(char_id):
+                refresh_character(combat.character)
+                settle_combat(char_id, combat, dict(state))
+            return
+        except Exception:
+            app.logger.exception(f"Settling real-time fight {char_id} failed (attempt {attempt}/{SETTLE_ATTEMPTS})")
+            time.sleep(0.5 * 2 ** (attempt - 1))
+    app.logger.error(f"Rewards for real-time fight {char_id} were not applied: {combat.to_state().encode().hex()}")
+
+def refresh_character(character):
+    """Reload a detached character's FIELDS (with queued values) as unchanged"""
+    current = write_behind.overlay(db.session.get(Character, character.id))
+    for field in FIELDS:
+        set_committed_value(character, field, getattr(current, field))
+
+@app.route('/api/combat_action', methods=['POST'])
+@character_route
+def combat_action():
+    """Execute a combat turn"""
+    data = request.json
+    char_id = data.get('character_id')
+    
+    combat = load_combat(char_id)
+    if combat is None:
+        return jsonify({'error': 'No active combat for this character'}), 404
+    
+    action = data.get('action', 'attack')
+    if action not in ACTIONS:
+        return jsonify({'error': f"'action' must be one of {', '.join(ACTIONS)}"}), 400
+    
+    # Resend anything after the client's last seen event (still in the ring buffer)
+    if isinstance(data.get('log_cursor'), int):
+        combat.log_cursor = data['log_cursor']
+    
+    state = combat.execute_turn(action)
+    if not save_fight(char_id, combat, state):
+        return fight_conflict()
+    
+    return jsonify(settle_combat(char_id, combat, state))
+
+@app.route('/api/combat_batch', methods=['POST'])
+@character_route
+def combat_batch():
+    """Resolve many turns in one request.
+
+    Body: {"character_id": 1, "actions": ["attack", ...]}
+      or: {"character_id": 1, "auto": {"hp_threshold": 0.3, "max_turns": 50}}
+    Auto mode attacks until victory, defeat, max_turns or HP drops to
+    hp_threshold of max. Each turn comes back as a compact list in
+    'turns', described by 'turn_fields'.
+    """
+    data = request.json
+    char_id = data.get('character_id')
+    
+    combat = load_combat(char_id)
+    if combat is None:
+        return jsonify({'error': 'No active combat for this character'}), 404
+    
+    if isinstance(data.get('log_cursor'), int):
+        combat.log_cursor = data['log_cursor']
+    
+    if 'auto' in data:
+        auto = data['auto'] or {}
+        try:
+            if not isinstance(auto, dict):
+                raise TypeError
+            hp_threshold = float(auto.get('hp_threshold', 0.0))
+            max_turns = int(auto.get('max_turns', MAX_BATCH_TURNS))
+        except (TypeError, ValueError):
+            return jsonify({'error': "'auto' must be an object with numeric hp_threshold and max_turns"}), 400
+        outcomes = combat.auto_battle(hp_threshold=hp_threshold, max_turns=max_turns)
+    else:
+        actions = data.get('actions')
+        if not isinstance(actions, list) or any(a not in ACTIONS for a in actions):
+            return jsonify({'error': f"'actions' must be a list of {', '.join(ACTIONS)}"}), 400
+        outcomes = combat.run_actions(actions)
+    
+    state = combat.get_state()
+    state['turn_fields'] = list(TurnOutcome._fields)
+    state['turns'] = [list(outcome) for outcome in outcomes]
+    if not save_fight(char_id, combat, state):
+        return fight_conflict()
+    
+    return jsonify(settle_combat(char_id, combat, state))
+
+@app.route('/api/combat_realtime', methods=['POST'])
+@character_route
+def combat_realtime():
+    """Let the character's fight play out in real time.
+
+    Body: {"character_id": 1} to start, {"character_id": 1, "stop": true}
+    to go back to turn-by-turn play. Both sides act on their own attack
+    timers and skills respect cooldown_ms; turns arrive on
+    /api/stream/<character_id>.
+    """
+    data = request.json
+    char_id = data.get('character_id')
+    if type(char_id) is not int:
+        return jsonify({'error': 'No active combat for this character'}), 404
+    
+    if data.get('stop'):
+        combat = combat_scheduler.remove(char_id)
+        if combat is None:
+            return jsonify({'error': 'No real-time combat for this character'}), 404
+        combat_store.put(char_id, combat.to_state())
+        return jsonify({'realtime': False, 'state': combat.get_state()})
+    
+    if char_id in combat_scheduler:
+        return jsonify({'error': 'A real-time fight is already running'}), 409
+    combat = load_combat(char_id)
+    if combat is None:
+        return jsonify({'error': 'No active combat for this character'}), 404
+    
+    # The scheduler owns the fight until it ends or is stopped
+    if not combat_store.delete(char_id, expected=combat.resumed_from):
+        return fight_conflict()
+    combat.log_cursor = combat.log.last_seq
+    # Attack timers and the scheduler's initiative roll aren't in the actions
+    combat.replayable = False
+    combat_scheduler.add(char_id, combat, on_action=publish_realtime, on_finish=finish_realtime)
+    combat_scheduler.start()
     
-    return jsonify(state)
+    return jsonify({'realtime': True, 'state': combat.get_state()})
+
+@app.route('/api/stream/<int:char_id>', methods=['GET'])
+def stream(char_id):
+    """Server-sent events for one character: combat turns, HP/chi changes, zone events."""
+    last_event_id = parse_last_event_id(
+        request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    )
+    return Response(
+        broker.subscribe(char_id, last_event_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/stats/win_rates', methods=['GET'])
+def get_win_rates():
+    """Hourly win rates from the combat log.
+
+    Query: ?by=zone|enemy&hours=24
+    """
+    by = request.args.get('by', 'zone')
+    if by not in ROLLUP_KEYS:
+        return jsonify({'error': f"'by' must be one of {', '.join(ROLLUP_KEYS)}"}), 400
+    hours = request.args.get('hours', 24, type=int)
+    
+    return jsonify({'by': by, 'hours': hours, 'rates': win_rates(by, hours)})
+
+@app.route('/api/stats/matchups/<int:char_id>', methods=['GET'])
+def get_matchups(char_id):
+    """Exact win/loss odds against each enemy that spawns in a zone.
+
+    Query: ?zone_id=<id> (default: the character's current zone). 'zone_win'
+    weighs each enemy's odds by its spawn weight.
+    """
+    character = write_behind.overlay(load_character_for_combat(char_id))
+    if character is None:
+        abort(404)
+    profile = combat_profiles.get(character)
+    game_data = get_game_data()
+    zone_id = request.args.get('zone_id', character.current_zone_id, type=int)
+    
+    matchups, zone_win, total_weight = [], 0.0, 0
+    for zone_enemy in game_data.spawnable_enemies(zone_id):
+        template = game_data.enemy_templates.get(zone_enemy.enemy_template_id)
+        if template is None:
+            continue
+        odds = win_probability(character, Enemy.from_template(template), character.skills, profile=profile)
+        matchups.append(dict(odds.summary(), enemy_template_id=template.id, name=template.name,
+                             level=template.level, spawn_weight=zone_enemy.spawn_weight))
+        zone_win += odds.win * zone_enemy.spawn_weight
+        total_weight += zone_enemy.spawn_weight
+    
+    return jsonify({
+        'character_id': character.id,
+        'zone_id': zone_id,
+        'zone_win': zone_win / total_weight if total_weight else None,
+        'matchups': matchups
+    })
 
 @app.route('/api/create_test_data', methods=['POST'])
 def create_test_data():
@@ -350,7 +674,21 @@ def create_test_data():
     
     return jsonify({'message': 'Test data created'})
 
-if __name__ == '__main__':
+def startup():
+    """Create missing tables and warm caches (write_behind replays crashed
+    workers' journals when it is set up, whatever server runs the app)"""
     with app.app_context():
         db.create_all()
+        get_game_data()  # warm the static content cache
+
+def shutdown():
+    """Flush queued character updates and combat history"""
+    combat_scheduler.stop()
+    settlement_pool.shutdown(wait=True)
+    broker.stop()
+    write_behind.stop()
+    combat_log.stop()
+
+if __name__ == '__main__':
+    startup()
     app.run(debug=True, port=5000)
@@ -0,0 +1,196 @@
+"""
+Vectorized Monte Carlo combat simulator for Five Winds.
+
+Runs many fights of one character build against an enemy in a single call,
+keeping HP/Chi/wounds for every fight in NumPy arrays and drawing each turn's
+random rolls in batches. The rules mirror combat.Combat (initiative, skill
+selection, chi costs, crits and defense) so results match the scalar engine
+statistically while running orders of magnitude faster.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from combat import select_hotbar_skill
+from combat_profile import character_profile, enemy_profile
+from rng import new_seed, numpy_stream
+
+DEFAULT_FIGHTS = 100_000
+DEFAULT_MAX_TURNS = 200
+PERCENTILES = (5, 25, 50, 75, 95)
+
+@dataclass
+class SimulationResult:
+    """Outcome of a batch of simulated fights"""
+    enemy_name: str
+    n_fights: int
+    wins: int
+    losses: int
+    timeouts: int
+    turns: np.ndarray = field(repr=False)  # turns taken by each fight
+    damage_dealt: np.ndarray = field(repr=False)  # total damage to the enemy per fight
+    damage_taken: np.ndarray = field(repr=False)  # wounds suffered per fight
+    victories: np.ndarray = field(repr=False)  # bool mask of won fights
+
+    @property
+    def win_rate(self):
+        return self.wins / self.n_fights if self.n_fights else 0.0
+
+    def turns_to_kill(self):
+        """Histogram of turns needed for won fights: {turns: count}"""
+        values, counts = np.unique(self.turns[self.victories], return_counts=True)
+        return {int(v): int(c) for v, c in zip(values, counts)}
+
+    def percentiles(self, values, qs=PERCENTILES):
+        if values.size == 0:
+            return {}
+        return {f'p{q}': float(v) for q, v in zip(qs, np.percentile(values, qs))}
+
+    def summary(self):
+        """JSON-friendly summary of the batch"""
+        won_turns = self.turns[self.victories]
+        return {
+            'enemy_name': self.enemy_name,
+            'fights': self.n_fights,
+            'wins': self.wins,
+            'losses': self.losses,
+            'timeouts': self.timeouts,
+            'win_rate': self.win_rate,
+            'mean_turns_to_kill': float(won_turns.mean()) if won_turns.size else None,
+            'turns_to_kill': self.turns_to_kill(),
+            'damage_dealt': self.percentiles(self.damage_dealt),
+            'damage_taken': self.percentiles(self.damage_taken)
+        }
+
+def attack_damage(rng, stat, weapon_damage, crit_chance, defense, return_crits=False, damage_bonus=0):
+    """Vectorized copy of Combat.basic_attack's damage formula"""
+    base_damage = stat * (weapon_damage / 10)
+    is_crit = rng.random(weapon_damage.shape[0]) < crit_chance
+    base_damage = np.where(is_crit, base_damage * 2, base_damage)
+    damage = np.maximum(1, np.trunc(base_damage + damage_bonus - defense)).astype(np.int64)
+    return (damage, is_crit) if return_crits else damage
+
+def simulate_fights(character, enemy, character_skills=None, n_fights=DEFAULT_FIGHTS,
+                    max_turns=DEFAULT_MAX_TURNS, seed=None, stream=0, profile=None):
+    """Run n_fights of character vs enemy and return a SimulationResult.
+
+    `character` and `enemy` only need the attributes Combat reads
+    (Character and Enemy rows, or any objects with the same fields);
+    `profile` is the character's CombatProfile if one is already built.
+    Fights still running after max_turns are counted as timeouts.
+    `seed` may be an int or a ready numpy Generator; workers sharing a seed
+    should pass distinct `stream` numbers to get non-overlapping draws.
+    """
+    rng = seed if isinstance(seed, np.random.Generator) else numpy_stream(seed, stream)
+    skill = select_hotbar_skill(character_skills)
+
+    # Character attack constants
+    profile = profile or character_profile(character)
+    body, spirit, flow = profile.body, profile.spirit, profile.flow
+    char_crit = profile.crit_chance
+    char_defense = profile.defense
+    char_bonus = profile.damage_bonus
+    if skill:
+        skill_cost = skill.chi_cost or 0
+        skill_stat = spirit if skill.skill_type == 'chi_kung' else body
+        skill_min, skill_max = skill.base_damage_min or 0, skill.base_damage_max or 0
+
+    # Enemy attack constants
+    foe = enemy_profile(enemy)
+    enemy_body, enemy_flow = foe.body, foe.flow
+    enemy_crit = foe.crit_chance
+    enemy_defense = foe.defense
+
+    # Per-fight state, compacted each turn to the fights still running
+    idx = np.arange(n_fights)
+    char_hp = np.full(n_fights, character.current_hp, dtype=np.int64)
+    char_chi = np.full(n_fights, character.current_chi, dtype=np.int64)
+    enemy_hp = np.full(n_fights, enemy.max_hp, dtype=np.int64)
+
+    turns = np.full(n_fights, max_turns, dtype=np.int32)
+    final_char_hp = np.empty(n_fights, dtype=np.int64)
+    final_enemy_hp = np.empty(n_fights, dtype=np.int64)
+
+    for turn in range(1, max_turns + 1):
+        m = idx.size
+        if m == 0:
+            break
+
+        player_first = (flow + rng.integers(1, 11, m)) >= (enemy_flow + rng.integers(1, 11, m))
+
+        # Player attack: skill when affordable, basic attack otherwise
+        basic_roll = rng.integers(profile.damage_min, profile.damage_max + 1, m)
+        if skill:
+            use_skill = char_chi >= skill_cost
+            weapon = np.where(use_skill, rng.integers(skill_min, skill_max + 1, m), basic_roll)
+            stat = np.where(use_skill, skill_stat, body)
+            chi_used = np.where(use_skill, skill_cost, 0)
+        else:
+            weapon, stat, chi_used = basic_roll, body, 0
+        player_damage = attack_damage(rng, stat, weapon, char_crit, enemy_defense, damage_bonus=char_bonus)
+        enemy_damage = attack_damage(rng, enemy_body, rng.integers(foe.damage_min, foe.damage_max + 1, m),
+                                     enemy_crit, char_defense)
+
+        # The side acting second only swings if it survived the first blow
+        player_acts = player_first | (char_hp - enemy_damage > 0)
+        enemy_acts = ~player_first | (enemy_hp - player_damage > 0)
+
+        enemy_hp -= np.where(player_acts, player_damage, 0)
+        char_chi -= np.where(player_acts, chi_used, 0)
+        char_hp -= np.where(enemy_acts, enemy_damage, 0)
+
+        done = (enemy_hp <= 0) | (char_hp <= 0)
+        if done.any():
+            finished = idx[done]
+            turns[finished] = turn
+            final_char_hp[finished] = char_hp[done]
+            final_enemy_hp[finished] = enemy_hp[done]
+            keep = ~done
+            idx, char_hp, char_chi, enemy_hp = idx[keep], char_hp[keep], char_chi[keep], enemy_hp[keep]
+
+    # Fights that hit the turn cap
+    final_char_hp[idx] = char_hp
+    final_enemy_hp[idx] = enemy_hp
+
+    victories = final_enemy_hp <= 0
+    defeats = final_char_hp <= 0
+    wins = int(victories.sum())
+    losses = int(defeats.sum())
+
+    return SimulationResult(
+        enemy_name=enemy.name,
+        n_fights=n_fights,
+        wins=wins,
+        losses=losses,
+        timeouts=n_fights - wins - losses,
+        turns=turns,
+        damage_dealt=enemy.max_hp - final_enemy_hp,
+        damage_taken=character.current_hp - final_char_hp,
+        victories=victories
+    )
+
+def simulate_roster(character, enemy_templates, character_skills=None, n_fights=DEFAULT_FIGHTS,
+                    max_turns=DEFAULT_MAX_TURNS, seed=None):
+    """Simulate a character against every EnemyTemplate.
+
+    Returns {template.id: SimulationResult}. Each template runs on the
+    stream numbered by its id, so adding a template does not shift the
+    others' results.
+    """
+    from models import Enemy
+
+    if seed is None:
+        seed = new_seed()
+    results = {}
+    for template in enemy_templates:
+        results[template.id] = simulate_fights(
+            character,
+            Enemy.from_template(template),
+            character_skills,
+            n_fights=n_fights,
+            max_turns=max_turns,
+            seed=seed,
+            stream=template.id
+        )
+    return results
@@ -0,0 +1,79 @@
+"""
+Constant-time enemy spawn selection.
+
+Each zone's non-boss spawn weights are turned into a Walker/Vose alias
+table once per game data load, and the level-based fallback pools are
+precomputed per character level, so picking an enemy for a new fight is
+two random draws and no queries.
+"""
+
+class AliasTable:
+    """Vose's alias method: O(n) build, O(1) weighted sampling"""
+    __slots__ = ('items', 'prob', 'alias')
+
+    def __init__(self, items, weights):
+        n = len(items)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("AliasTable needs at least one positive weight")
+        self.items = tuple(items)
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Leftovers are 1.0 up to rounding error
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def sample(self, rng):
+        """Pick an item using one draw from rng.random()"""
+        x = rng.random() * len(self.items)
+        i = int(x)
+        return self.items[i] if x - i < self.prob[i] else self.items[self.alias[i]]
+
+class SpawnTables:
+    """Per-zone alias tables plus level-banded fallback pools for a GameData load"""
+
+    LEVEL_SPREAD = 2  # fallback enemies are within this many levels of the character
+
+    def __init__(self, game_data):
+        templates = game_data.enemy_templates
+        self.all_templates = tuple(templates.values())
+
+        self.zones = {}
+        for zone_id in game_data.zone_enemies:
+            spawns = [ze for ze in game_data.spawnable_enemies(zone_id) if ze.spawn_weight > 0]
+            if spawns:
+                self.zones[zone_id] = AliasTable(
+                    [templates[ze.enemy_template_id] for ze in spawns],
+                    [ze.spawn_weight for ze in spawns]
+                )
+
+        # Templates without a level only spawn from zone tables or the any-enemy fallback
+        levelled = [t for t in self.all_templates if t.level is not None]
+        self.levels = {}
+        if levelled:
+            spread = self.LEVEL_SPREAD
+            lowest = min(t.level for t in levelled) - spread
+            highest = max(t.level for t in levelled) + spread
+            for level in range(lowest, highest + 1):
+                band = tuple(t for t in levelled if level - spread <= t.level <= level + spread)
+                if band:
+                    self.levels[level] = band
+
+    def pick(self, zone_id, level, rng):
+        """EnemyTemplate for a fight in zone_id at the character's level, or None"""
+        table = self.zones.get(zone_id)
+        if table is not None:
+            return table.sample(rng)
+        # Fallback: enemies near the character's level, then any enemy
+        pool = self.levels.get(level) or self.all_templates
+        return rng.choice(pool) if pool else None
@@ -0,0 +1,293 @@
+"""
+Server-sent event streams, one channel per character.
+
+The server publishes turn results, HP/chi changes and zone events to an
+EventBroker as they happen; pages subscribe with EventSource on
+/api/stream/<character_id> instead of re-fetching state after every action.
+Each channel numbers its events and keeps the last few, so a reconnecting
+client that sends Last-Event-ID gets what it missed.
+
+EventBroker channels live in this process. With several workers, use
+SQLiteEventBroker (create_event_broker('sqlite:///...')): every publish
+goes through a shared SQLite table that each worker polls, so a stream on
+any worker sees events from all of them, and event ids are the same
+everywhere. A stream holds its connection open for as long as the page
+does, so serve streams from the ASGI server or threaded workers; under
+sync workers each open stream occupies a whole worker.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+from serializers import dumps
+
+# Event types
+COMBAT = 'combat'        # a fight started or advanced (full combat state)
+CHARACTER = 'character'  # HP/chi/XP/gold/level changed
+ZONE = 'zone'            # the character moved or something happened in its zone
+
+HEARTBEAT_SECONDS = 15
+
+def format_sse(event_id, event, data):
+    """One text/event-stream message; data is encoded JSON"""
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (event_id, event.encode('utf-8'), data)
+
+HEARTBEAT = b': ping\n\n'
+# Sent first so headers go out at once; also sets the client's reconnect delay (ms)
+OPEN = b'retry: 3000\n\n'
+
+class Channel:
+    __slots__ = ('last_id', 'recent', 'subscribers')
+
+    def __init__(self, replay):
+        self.last_id = 0
+        self.recent = deque(maxlen=replay)  # (id, message bytes)
+        self.subscribers = set()
+
+class Subscription:
+    """Blocking iterator over a channel's messages, with heartbeats"""
+
+    def __init__(self, broker, char_id, max_queue):
+        self.broker = broker
+        self.char_id = char_id
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # Too slow to keep up: end the stream, the client reconnects with Last-Event-ID
+            self.closed = True
+            self.broker.unsubscribe(self.char_id, self)
+
+    def __iter__(self):
+        yield OPEN
+        try:
+            while not self.closed or not self.queue.empty():
+                try:
+                    yield self.queue.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield HEARTBEAT
+        finally:
+            self.close()
+
+    def close(self):
+        self.closed = True
+        self.broker.unsubscribe(self.char_id, self)
+
+class EventBroker:
+    """Thread-safe per-character publish/subscribe"""
+
+    def __init__(self, replay=32, max_queue=256, max_idle_channels=1000):
+        self.replay = replay
+        self.max_queue = max_queue
+        self.max_idle_channels = max_idle_channels
+        self._channels = OrderedDict()  # char_id -> Channel, least recently used first
+        self._lock = threading.Lock()
+
+    def publish(self, char_id, event, data):
+        """Send an event to the character's subscribers; returns its id (0 if nobody listens)"""
+        with self._lock:
+            channel = self._channels.get(char_id)
+            if channel is None:
+                return 0
+            channel.last_id += 1
+            message = format_sse(channel.last_id, event, dumps(data))
+            channel.recent.append((channel.last_id, message))
+            subscribers = list(channel.subscribers)
+            event_id = channel.last_id
+        for subscriber in subscribers:
+            subscriber.deliver(message)
+        return event_id
+
+    def subscribe(self, char_id, last_event_id=None, subscriber=None):
+        """Subscribe to a character's channel, replaying events after last_event_id.
+
+        Without a subscriber, returns a blocking Subscription to iterate; any
+        object with deliver(message) can be passed instead.
+        """
+        subscriber = subscriber or Subscription(self, char_id, self.max_queue)
+        with self._lock:
+            channel = self._channels.get(char_id)
+            if channel is None:
+                channel = self._channels[char_id] = Channel(self.replay)
+            self._channels.move_to_end(char_id)
+            channel.subscribers.add(subscriber)
+            missed = [m for event_id, m in channel.recent
+                      if last_event_id is not None and event_id > last_event_id]
+        for message in missed:
+            subscriber.deliver(message)
+        return subscriber
+
+    def unsubscribe(self, char_id, subscriber):
+        with self._lock:
+            channel = self._channels.get(char_id)
+            if channel is None:
+                return
+            channel.subscribers.discard(subscriber)
+            # Idle channels are kept (for Last-Event-ID replay) up to a limit
+            idle = [cid for cid, ch in self._channels.items() if not ch.subscribers]
+            for cid in idle[:max(0, len(idle) - self.max_idle_channels)]:
+                del self._channels[cid]
+
+    def subscriber_count(self, char_id):
+        channel = self._channels.get(char_id)
+        return len(channel.subscribers) if channel else 0
+
+    def stop(self):
+        """Release background resources (none for in-process channels)"""
+
+class SQLiteEventBroker(EventBroker):
+    """EventBroker shared by every worker through a SQLite file.
+
+    publish() queues the event; a relay thread per process writes queued
+    events in one transaction, then reads everything newer than it has seen
+    (from any worker) and delivers it to local subscribers. Rows are the
+    event ids and the Last-Event-ID replay buffer, kept for retention
+    seconds.
+    """
+
+    def __init__(self, path, poll_interval=0.1, retention=60.0, logger=None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.logger = logger or logging.getLogger(__name__)
+        # Replays deliver while holding it, and a full subscriber unsubscribes itself
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._outbox = []  # (character_id, event, data, created_at)
+        self._outbox_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pruned_at = 0.0
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS stream_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                character_id INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                data BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_stream_events_character ON stream_events(character_id, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_stream_events_created ON stream_events(created_at)')
+        # Events from before this process started are only reachable through replay
+        self._cursor = conn.execute('SELECT COALESCE(MAX(id), 0) FROM stream_events').fetchone()[0]
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def publish(self, char_id, event, data):
+        """Queue an event for every worker's subscribers; its id is assigned
+        when the relay writes it, so this returns 0"""
+        with self._outbox_lock:
+            self._outbox.append((char_id, event, dumps(data), time.time()))
+        self._ensure_started()
+        self._wake.set()
+        return 0
+
+    def subscribe(self, char_id, last_event_id=None, subscriber=None):
+        subscriber = subscriber or Subscription(self, char_id, self.max_queue)
+        self._ensure_started()
+        with self._lock:
+            channel = self._channels.get(char_id)
+            if channel is None:
+                channel = self._channels[char_id] = Channel(self.replay)
+            self._channels.move_to_end(char_id)
+            channel.subscribers.add(subscriber)
+            if last_event_id is not None:
+                # Up to what the relay has delivered; it sends the rest, after these
+                missed = self._connection().execute(
+                    'SELECT id, event, data FROM stream_events WHERE character_id = ? AND id > ? AND id <= ? '
+                    'ORDER BY id DESC LIMIT ?',
+                    (char_id, last_event_id, self._cursor, self.replay)
+                ).fetchall()
+                for event_id, event, data in reversed(missed):
+                    subscriber.deliver(format_sse(event_id, event, data))
+        return subscriber
+
+    # ============================================
+    # RELAY
+    # ============================================
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._outbox_lock:
+                if self._thread is None and not self._stopping.is_set():
+                    self._thread = threading.Thread(target=self._run, name='event-relay', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.relay()
+            except Exception:
+                self.logger.exception("Event relay failed")
+
+    def relay(self):
+        """Write queued events, then deliver new ones from every worker; returns events delivered"""
+        with self._outbox_lock:
+            batch, self._outbox = self._outbox, []
+        conn = self._connection()
+        if batch:
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany(
+                    'INSERT INTO stream_events (character_id, event, data, created_at) VALUES (?, ?, ?, ?)', batch
+                )
+        rows = conn.execute(
+            'SELECT id, character_id, event, data FROM stream_events WHERE id > ? ORDER BY id', (self._cursor,)
+        ).fetchall()
+        for event_id, char_id, event, data in rows:
+            message = format_sse(event_id, event, data)
+            with self._lock:
+                self._cursor = event_id
+                channel = self._channels.get(char_id)
+                subscribers = list(channel.subscribers) if channel else ()
+            for subscriber in subscribers:
+                subscriber.deliver(message)
+        now = time.time()
+        if now - self._pruned_at > self.retention / 2:
+            self._pruned_at = now
+            conn.execute('DELETE FROM stream_events WHERE created_at < ?', (now - self.retention,))
+        return len(rows)
+
+    def stop(self):
+        """Stop the relay thread after writing whatever is still queued"""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.relay()
+
+def create_event_broker(url='memory', logger=None):
+    """Build a broker from a config string: 'memory' or 'sqlite:///path/to/file.db'"""
+    if url == 'memory':
+        return EventBroker()
+    if url.startswith('sqlite:///'):
+        return SQLiteEventBroker(url[len('sqlite:///'):], logger=logger)
+    raise ValueError(f"Unknown event broker: {url}")
+
+def parse_last_event_id(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
@@ -0,0 +1,49 @@
+"""Shared test setup.
+
+The modules live at the repository root (flat layout). server.py reads its
+database URL, stores and write-behind journal from the environment when it
+is imported, so they point into a temporary directory before any test
+imports it; the `app` fixture builds the database there with init_db.
+"""
+
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='five_winds_tests_')
+DB_PATH = os.path.join(TMP_DIR, 'dragons.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['COMBAT_STORE'] = 'memory'
+os.environ['EVENT_BROKER'] = 'memory'
+os.environ['WRITE_BEHIND_JOURNAL'] = os.path.join(TMP_DIR, 'write_behind.journal')
+
+_names = itertools.count(1)
+
+@pytest.fixture(scope='session')
+def app():
+    import init_db
+    init_db.init_database(DB_PATH)
+    import server
+    server.app.config['QUERY_COUNT_HEADER'] = True
+    server.startup()
+    yield server.app
+    server.shutdown()
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def character(client):
+    """Id of a freshly created character"""
+    response = client.post('/api/character/create',
+                           json={'name': f'Tester {next(_names)}', 'clan_id': 1, 'role_id': 1})
+    assert response.status_code == 200
+    return response.get_json()['character']['id']
@@ -0,0 +1,75 @@
+"""CombatState encoding and Combat.replay determinism"""
+
+import pytest
+
+from combat import Combat
+from combat_state import CombatState
+from game_data import get_game_data
+from models import Enemy
+from queries import load_character_for_combat
+
+ACTIONS = ['attack', 'defend', 'attack', 'attack', 'defend', 'attack']
+
+@pytest.fixture
+def fighters(app, character):
+    """(character, skills, enemy template) for a fresh character"""
+    with app.app_context():
+        loaded = load_character_for_combat(character)
+        template = next(iter(get_game_data().enemy_templates.values()))
+        yield loaded, list(loaded.skills), template
+
+def new_combat(fighters, seed=1234):
+    character, skills, template = fighters
+    return Combat(character, Enemy.from_template(template), skills, seed=seed)
+
+def play(combat, actions):
+    for action in actions:
+        if combat.is_over:
+            break
+        combat.execute_turn(action)
+    return combat
+
+def test_state_round_trip(fighters):
+    combat = play(new_combat(fighters), ACTIONS[:3])
+    state = combat.to_state()
+    data = state.encode()
+    assert CombatState.decode(data) == state
+    assert len(data) >= CombatState.SIZE
+    assert CombatState.decode(data).encode() == data
+
+def test_resumed_fight_matches(fighters):
+    character, skills, template = fighters
+    played = play(new_combat(fighters), ACTIONS)
+    resumed = play(new_combat(fighters), ACTIONS[:2])
+    resumed = Combat.from_state(CombatState.decode(resumed.to_state().encode()),
+                                character, Enemy.from_template(template), skills)
+    play(resumed, ACTIONS[2:])
+    assert resumed.get_state(since=0) == played.get_state(since=0)
+    assert resumed.actions == played.actions
+    assert resumed.rng.getstate() == played.rng.getstate()
+
+def test_unknown_version_is_rejected(fighters):
+    data = bytearray(new_combat(fighters).to_state().encode())
+    data[0] = CombatState.VERSION + 1
+    with pytest.raises(ValueError):
+        CombatState.decode(bytes(data))
+
+def test_action_limit(fighters):
+    combat = new_combat(fighters)
+    combat.actions = ['defend'] * (CombatState.MAX_ACTIONS + 1)
+    state = CombatState.decode(combat.to_state().encode())
+    assert not state.replayable
+    assert state.actions == b''
+    with pytest.raises(ValueError):
+        CombatState(1, 1, 1, 1, 1, actions=b'\0' * (CombatState.MAX_ACTIONS + 1))
+
+def test_replay_is_deterministic(fighters):
+    character, skills, template = fighters
+    played = play(new_combat(fighters, seed=99), ACTIONS * 3)
+    state = played.to_state()
+    assert state.replayable
+    replayed = Combat.replay(character, Enemy.from_template(template), state.rng_seed,
+                             played.actions, skills, stream=state.rng_stream, counter=state.rng_start)
+    assert replayed.actions == played.actions
+    assert replayed.get_state(since=0) == played.get_state(since=0)
+    assert replayed.rng.counter == played.rng.counter
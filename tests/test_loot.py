@@ -0,0 +1,59 @@
+"""Inventory stacking of loot drops"""
+
+from sqlalchemy import select
+
+import loot
+from loot import add_to_inventory, stack_rows
+from models import db, CharacterInventory
+
+POTION, SWORD = 1, 2
+STACK_SIZES = {POTION: 5, SWORD: 1}
+
+def test_fills_existing_stacks_first():
+    bag = [(10, POTION, 3, 1), (11, SWORD, 1, 2), (12, POTION, 5, 4)]
+    rows = stack_rows(7, {POTION: 4}, STACK_SIZES, bag)
+    # Tops up the partial stack, then opens one in the lowest free slot
+    assert [(r['id'], r['quantity'], r['bag_slot']) for r in rows] == [(10, 5, 1), (None, 2, 3)]
+
+def test_unstackable_items_take_a_slot_each():
+    rows = stack_rows(7, {SWORD: 3}, STACK_SIZES, [(10, SWORD, 1, 2)])
+    assert [(r['id'], r['quantity'], r['bag_slot']) for r in rows] == [(None, 1, 1), (None, 1, 3), (None, 1, 4)]
+
+def bag_of(character):
+    table = CharacterInventory.__table__
+    return db.session.execute(
+        select(table.c.item_template_id, table.c.quantity, table.c.bag_slot)
+        .where(table.c.character_id == character).order_by(table.c.bag_slot)
+    ).all()
+
+def test_add_to_inventory_stacks_across_drops(app, character):
+    with app.app_context():
+        start = len(bag_of(character))
+        add_to_inventory(character, {POTION: 3}, STACK_SIZES)
+        add_to_inventory(character, {POTION: 4}, STACK_SIZES)
+        db.session.commit()
+        potions = [quantity for item_id, quantity, _ in bag_of(character)[start:] if item_id == POTION]
+        assert sorted(potions) == [2, 5]
+
+def test_retries_when_a_slot_is_taken(app, character, monkeypatch):
+    real_stack_rows = loot.stack_rows
+    attempts = []
+
+    def racing(character_id, drops, stack_sizes, bag):
+        rows = real_stack_rows(character_id, drops, stack_sizes, bag)
+        if not attempts:
+            # Another settlement takes the chosen slot first
+            db.session.execute(CharacterInventory.__table__.insert().values(
+                character_id=character_id, item_template_id=SWORD, quantity=1,
+                bag_slot=rows[0]['bag_slot'], refinement_level=0
+            ))
+        attempts.append(rows)
+        return rows
+
+    monkeypatch.setattr(loot, 'stack_rows', racing)
+    with app.app_context():
+        assert add_to_inventory(character, {SWORD: 1}, STACK_SIZES) == 1
+        assert len(attempts) == 2
+        slots = [slot for _, _, slot in bag_of(character)]
+        assert len(slots) == len(set(slots))
+        db.session.rollback()
@@ -0,0 +1,46 @@
+"""Write-behind queue: changed-field recording and journal recovery"""
+
+import json
+
+import pytest
+
+from models import db, Character
+from persistence import WriteBehindQueue
+
+@pytest.fixture
+def queue(app, tmp_path):
+    queue = WriteBehindQueue(app, journal_path=str(tmp_path / 'write_behind.journal'))
+    yield queue
+    queue.stop()
+
+def test_records_only_changed_fields(app, queue, character):
+    with app.app_context():
+        char = db.session.get(Character, character)
+        char.current_hp -= 5
+        queue.record(char)
+        assert queue.pending(character) == {'current_hp': char.current_hp}
+        db.session.rollback()
+
+def test_unchanged_character_is_not_queued(app, queue, character):
+    with app.app_context():
+        queue.record(db.session.get(Character, character))
+    assert len(queue) == 0
+
+def test_recovers_crashed_journal(app, tmp_path, character):
+    base = tmp_path / 'crashed.journal'
+    # Left by a process that died mid-write: the last line is torn
+    base.write_text(
+        json.dumps({'id': character, 'values': {'gold': 500, 'current_hp': 7}}) + '\n'
+        + json.dumps({'id': character, 'values': {'gold': 777}}) + '\n'
+        + '{"id": ' + str(character) + ', "val',
+        encoding='utf-8'
+    )
+    queue = WriteBehindQueue(app, journal_path=str(base))
+    try:
+        with app.app_context():
+            char = db.session.get(Character, character)
+            assert (char.gold, char.current_hp) == (777, 7)
+        assert len(queue) == 0
+        assert list(tmp_path.iterdir()) == []
+    finally:
+        queue.stop()
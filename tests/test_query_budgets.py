@@ -0,0 +1,28 @@
+"""SQL statements per request (X-Query-Count), so an N+1 regression fails here"""
+
+def query_count(response):
+    assert response.status_code == 200
+    return int(response.headers['X-Query-Count'])
+
+def test_clans_come_from_the_game_data_cache(client):
+    client.get('/api/clans')  # the first request may load the game data
+    assert query_count(client.get('/api/clans')) == 0
+
+def test_start_combat(client, character):
+    client.get('/api/clans')
+    # Character, its skills and (first fight only) its gear for the combat profile
+    response = client.post('/api/start_combat', json={'character_id': character})
+    assert query_count(response) <= 3
+
+def test_combat_action(client, character):
+    client.post('/api/start_combat', json={'character_id': character})
+    # Defending can't end the fight, so no settlement statements are counted
+    response = client.post('/api/combat_action', json={'character_id': character, 'action': 'defend'})
+    assert not response.get_json()['victory']
+    assert query_count(response) <= 2
+
+def test_streamed_responses_have_no_count(client, character):
+    response = client.get('/api/characters')
+    assert response.is_streamed
+    assert 'X-Query-Count' not in response.headers
+    assert response.get_data()
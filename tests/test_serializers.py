@@ -0,0 +1,63 @@
+"""dumps() with orjson and with the stdlib encoder"""
+
+import importlib.util
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytest
+from flask import Flask
+
+import serializers
+from serializers import FastJSONProvider
+
+ENCODERS = [serializers.stdlib_dumps]
+if serializers.orjson_dumps is not None:
+    ENCODERS.append(serializers.orjson_dumps)
+
+VALUE = {
+    'name': 'Lóng Wěi',
+    'turn': 3,
+    'hp': np.int64(120),
+    'rolls': np.array([1, 2, 3]),
+    'crit_chance': 0.25,
+    'skills': {7: 'Palm Strike'},
+    'started_at': datetime(2026, 1, 2, 3, 4, 5),
+    'log': [{'type': 'player_attack', 'damage': 13, 'crit': False}, None],
+}
+
+@pytest.mark.parametrize('dumps', ENCODERS)
+def test_dumps_compact_utf8(dumps):
+    data = dumps({'b': 1, 'a': 'é'})
+    assert data == '{"b":1,"a":"é"}'.encode('utf-8')
+    assert dumps({'b': 1, 'a': 2}, sort_keys=True) == b'{"a":2,"b":1}'
+
+@pytest.mark.parametrize('dumps', ENCODERS)
+def test_dumps_extra_types(dumps):
+    assert dumps(VALUE) == serializers.stdlib_dumps(VALUE)
+    assert b'"rolls":[1,2,3]' in dumps(VALUE)
+    assert b'"started_at":"Fri, 02 Jan 2026 03:04:05 GMT"' in dumps(VALUE)
+
+def test_orjson_matches_stdlib():
+    pytest.importorskip('orjson')
+    assert serializers.dumps is serializers.orjson_dumps
+    assert serializers.orjson_dumps(VALUE, sort_keys=True) == serializers.stdlib_dumps(VALUE, sort_keys=True)
+
+def test_falls_back_without_orjson(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'orjson', None)  # import raises ImportError
+    spec = importlib.util.spec_from_file_location('serializers_without_orjson', serializers.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert module.orjson_dumps is None
+    assert module.dumps is module.stdlib_dumps
+    assert module.dumps(VALUE) == serializers.stdlib_dumps(VALUE)
+
+def test_provider_settings():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    with app.app_context():
+        assert app.json.dumps({'b': 1, 'a': 'é'}) == '{"b":1,"a":"é"}'
+        app.json.sort_keys = True
+        assert app.json.response(b=1, a=2).get_data() == b'{"a":2,"b":1}'
+        app.json.ensure_ascii = True
+        assert app.json.dumps({'a': 'é'}) == '{"a": "\\u00e9"}'
@@ -0,0 +1,136 @@
+"""
+Precomputed zone routing.
+
+Zones store their neighbours as north/south/east/west ids. A ZoneGraph
+treats every link as two-way, and once per game data load it runs a
+breadth-first search from every zone. The result is the shortest path
+between every pair of zones, so a route lookup is a dict access instead of
+a graph walk.
+
+Level-aware routes only pass through zones the character is levelled for,
+i.e. recommended_level_min <= level. The destination may be any zone. There
+is one such table per distinct recommended_level_min. The hunting zones
+recommended for each level are precomputed as well, so finding the path to
+the nearest one is a handful of lookups.
+"""
+
+from bisect import bisect_right
+from collections import deque
+
+DIRECTIONS = ('north', 'south', 'east', 'west')
+
+# Travel methods (travel_log.travel_method) and how far each may go in one trip
+WALK = 'walk'  # to an adjacent zone
+LIGHTFOOT = 'lightfoot'  # up to LIGHTFOOT_HOPS zones along the shortest route
+FAST_TRAVEL = 'fast_travel'  # to any reachable safe zone (town)
+TRAVEL_METHODS = (WALK, LIGHTFOOT, FAST_TRAVEL)
+LIGHTFOOT_HOPS = 3
+
+def shortest_paths(neighbours, source, passable=None):
+    """Shortest path from source to every reachable zone, {zone_id: (source, ..., zone_id)}.
+
+    Only zones accepted by passable (all by default) are travelled
+    through; others can still be reached as destinations.
+    """
+    paths = {source: (source,)}
+    queue = deque([source])
+    while queue:
+        zone_id = queue.popleft()
+        if zone_id != source and passable is not None and not passable(zone_id):
+            continue
+        for neighbour in neighbours[zone_id]:
+            if neighbour not in paths:
+                paths[neighbour] = paths[zone_id] + (neighbour,)
+                queue.append(neighbour)
+    return paths
+
+class ZoneGraph:
+    """All-pairs shortest paths over the zone adjacency of a GameData load"""
+
+    def __init__(self, game_data):
+        self.zones = game_data.zones
+        neighbours = {zone_id: set() for zone_id in self.zones}
+        for zone in self.zones.values():
+            for direction in DIRECTIONS:
+                other = getattr(zone, f'{direction}_zone_id')
+                if other in neighbours and other != zone.id:
+                    neighbours[zone.id].add(other)
+                    neighbours[other].add(zone.id)
+        # Sorted so ties between equally short paths always break the same way
+        self.neighbours = {zone_id: tuple(sorted(ids)) for zone_id, ids in neighbours.items()}
+
+        self.paths = {zone_id: shortest_paths(self.neighbours, zone_id) for zone_id in self.zones}
+
+        # One table per level at which another zone opens up
+        self.level_thresholds = sorted({self.min_level(zone) for zone in self.zones.values()})
+        self.level_paths = []
+        for threshold in self.level_thresholds:
+            passable = lambda zone_id, threshold=threshold: self.min_level(self.zones[zone_id]) <= threshold
+            self.level_paths.append({zone_id: shortest_paths(self.neighbours, zone_id, passable)
+                                     for zone_id in self.zones})
+
+        # Hunting zones (not safe) recommended at each level
+        self.hunting_zones = {}
+        for zone in self.zones.values():
+            if zone.is_safe_zone:
+                continue
+            top = zone.recommended_level_max or self.min_level(zone)
+            for level in range(self.min_level(zone), top + 1):
+                self.hunting_zones.setdefault(level, []).append(zone.id)
+
+    @staticmethod
+    def min_level(zone):
+        return zone.recommended_level_min or 1
+
+    def _paths_for(self, level):
+        if level is None:
+            return self.paths
+        band = bisect_right(self.level_thresholds, level) - 1
+        return self.level_paths[max(band, 0)]
+
+    def route(self, from_zone_id, to_zone_id, level=None):
+        """Zone ids from one zone to another, both included, or None if unreachable.
+
+        With a level, the route only passes through zones recommended for
+        that level or below.
+        """
+        return self._paths_for(level).get(from_zone_id, {}).get(to_zone_id)
+
+    def distance(self, from_zone_id, to_zone_id, level=None):
+        """Number of zone changes on the route, or None if unreachable"""
+        path = self.route(from_zone_id, to_zone_id, level)
+        return None if path is None else len(path) - 1
+
+    def next_hop(self, from_zone_id, to_zone_id, level=None):
+        """The adjacent zone to move to next, or None if unreachable or already there"""
+        path = self.route(from_zone_id, to_zone_id, level)
+        return path[1] if path and len(path) > 1 else None
+
+    def recommended_route(self, from_zone_id, level):
+        """Route to the nearest hunting zone recommended for level, or None"""
+        routes = [route for route in (self.route(from_zone_id, zone_id, level)
+                                      for zone_id in self.hunting_zones.get(level, ()))
+                  if route is not None]
+        return min(routes, key=len, default=None)
+
+    def travel_destination(self, from_zone_id, to_zone_id, method, level=None):
+        """Where a trip by method toward to_zone_id ends, or None if not allowed.
+
+        Walking moves one zone along the (level-aware) route, lightfoot up
+        to LIGHTFOOT_HOPS zones, and fast travel goes straight to any
+        reachable safe zone.
+        """
+        path = self.route(from_zone_id, to_zone_id, None if method == FAST_TRAVEL else level)
+        if path is None or len(path) < 2:
+            return None
+        if method == WALK:
+            return path[1]
+        if method == LIGHTFOOT:
+            return path[min(LIGHTFOOT_HOPS, len(path) - 1)]
+        if method == FAST_TRAVEL:
+            return to_zone_id if self.zones[to_zone_id].is_safe_zone else None
+        raise ValueError(f"Unknown travel method: {method}")
+
+    def describe(self, path):
+        """JSON-friendly list of the zones on a path"""
+        return [{'id': zone_id, 'name': self.zones[zone_id].name} for zone_id in path]